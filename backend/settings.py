@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "corsheaders",
@@ -107,13 +108,61 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Project API responses, the catalog version and hit counters. It must
+    # be shared by every gunicorn worker and by fetch_projects, or a write
+    # would only invalidate the process that made it: files on local disk
+    # by default, a shared backend when the app runs on several hosts.
+    "projects": {
+        "BACKEND": config(
+            "PROJECTS_CACHE_BACKEND",
+            default="django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": config(
+            "PROJECTS_CACHE_LOCATION", default=str(BASE_DIR / "cache" / "projects")
+        ),
+        "TIMEOUT": config("PROJECTS_CACHE_TIMEOUT", default=300, cast=int),
+    },
+    # Sessions and user profiles, read on every authenticated request. It
+    # must be shared by every worker, or a logout in one would not end the
+    # session in the others: files on local disk by default, a shared
+    # backend when the app runs on several hosts. The files are unpickled,
+    # so they live in a directory the app owns, never a world-writable one.
+    "users": {
+        "BACKEND": config(
+            "USERS_CACHE_BACKEND",
+            default="django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": config(
+            "USERS_CACHE_LOCATION", default=str(BASE_DIR / "cache" / "users")
+        ),
+        "TIMEOUT": config("USERS_CACHE_TIMEOUT", default=3600, cast=int),
+    },
+}
+
+# Sessions are written through to the database and read from the cache
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "users"
+
 # 42 OAuth Configuration
 OAUTH_42_CLIENT_ID = config("API_42_UID")
 OAUTH_42_CLIENT_SECRET = config("API_42_SECRET")
 OAUTH_42_AUTHORIZATION_URL = "https://api.intra.42.fr/oauth/authorize"
 OAUTH_42_TOKEN_URL = "https://api.intra.42.fr/oauth/token"
-OAUTH_42_USER_URL = "http://api.intra.42.fr/v2/me"
+OAUTH_42_USER_URL = "https://api.intra.42.fr/v2/me"
 OAUTH_42_REDIRECT_URI = "https://42projects.cc/api/auth/callback/"
+# Seconds the login callback waits on the 42 API before giving up
+OAUTH_42_CONNECT_TIMEOUT = config("OAUTH_42_CONNECT_TIMEOUT", default=3, cast=float)
+OAUTH_42_READ_TIMEOUT = config("OAUTH_42_READ_TIMEOUT", default=10, cast=float)
+
+# Avatars copied from the 42 CDN into MEDIA_ROOT/avatars (see users.avatars)
+AVATAR_THUMBNAIL_SIZE = config("AVATAR_THUMBNAIL_SIZE", default=128, cast=int)
+AVATAR_MAX_BYTES = config("AVATAR_MAX_BYTES", default=5 * 1024 * 1024, cast=int)
+AVATAR_CONNECT_TIMEOUT = config("AVATAR_CONNECT_TIMEOUT", default=3, cast=float)
+AVATAR_READ_TIMEOUT = config("AVATAR_READ_TIMEOUT", default=10, cast=float)
 
 # CORS settings - Updated for Cloudflare Tunnel
 CORS_ALLOW_CREDENTIALS = True
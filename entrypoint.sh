@@ -52,7 +52,9 @@ if [ "$DJANGO_ENV" = "development" ]; then
     exec python manage.py runserver 0.0.0.0:8000
 else
     echo "Starting Gunicorn production server..."
-    exec gunicorn backend.wsgi:application \
+    # ASGI workers, so logins waiting on the 42 API do not hold a worker
+    exec gunicorn backend.asgi:application \
+        --worker-class uvicorn_worker.UvicornWorker \
         --bind 0.0.0.0:8000 \
         --workers 3 \
         --timeout 120 \
@@ -46,6 +46,52 @@ export type ProjectsResponse = {
   results: Project[];
 };
 
+export type ProjectSuggestion = {
+  id: number;
+  name: string;
+  slug: string;
+};
+
+export type ProjectFacets = {
+  count: number;
+  languages: Record<string, number>;
+  specializations: Record<string, number>;
+  solo: { true: number; false: number };
+  difficulty: Record<string, number>;
+};
+
+// Progress of the logged-in user, for the `status` filter
+export type ProjectStatus = 'finished' | 'in_progress' | 'available';
+
+export type ProjectChanges = {
+  // Opaque token to send back as `since`; changes may be repeated, so
+  // apply them as upserts on `id`
+  watermark: string;
+  changed: Project[];
+  deleted: number[];
+};
+
+// The list endpoint is compact by default; the dashboard renders the
+// description, objectives and prerequisites inline, so ask for them.
+const DASHBOARD_FIELDS = [
+  'id',
+  'project_id',
+  'name',
+  'slug',
+  'description',
+  'parent_name',
+  'objectives',
+  'estimate_time',
+  'solo',
+  'xp_points',
+  'prerequisites',
+  'subject_download_url',
+  'languages',
+  'specializations',
+  'created_at',
+  'updated_at',
+].join(',');
+
 export const projectsApi = {
   getProjects: (params?: {
     search?: string;
@@ -53,8 +99,22 @@ export const projectsApi = {
     languages?: string;
     specializations?: string;
     ordering?: string;
-  }) => api.get<Project[]>('/projects/', { params }),
+    status?: ProjectStatus;
+  }) => api.get<Project[]>('/projects/', { params: { fields: DASHBOARD_FIELDS, ...params } }),
   getProject: (id: number) => api.get<Project>(`/projects/${id}/`),
+  getFacets: (params?: {
+    search?: string;
+    solo?: boolean;
+    languages?: string;
+    specializations?: string;
+    status?: ProjectStatus;
+  }) => api.get<ProjectFacets>('/projects/facets/', { params }),
+  getChanges: (since?: string | null) =>
+    api.get<ProjectChanges>('/projects/changes/', {
+      params: { fields: DASHBOARD_FIELDS, ...(since ? { since } : {}) },
+    }),
+  suggestProjects: (q: string, limit?: number) =>
+    api.get<ProjectSuggestion[]>('/projects/suggest/', { params: { q, limit } }),
 };
 
 // Auth API
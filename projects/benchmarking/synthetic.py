@@ -0,0 +1,159 @@
+import random
+
+from projects.models import Language, Project, Specialization
+
+SLUGS = [
+    "libft",
+    "get_next_line",
+    "ft_printf",
+    "born2beroot",
+    "minitalk",
+    "pipex",
+    "so_long",
+    "fdf",
+    "fract-ol",
+    "push_swap",
+    "philosophers",
+    "minishell",
+    "cub3d",
+    "minirt",
+    "netpractice",
+    "cpp-module-00",
+    "inception",
+    "webserv",
+    "ft_irc",
+    "ft_transcendence",
+    "malloc",
+    "ft_ssl_md5",
+    "kfs-1",
+    "taskmaster",
+    "matrix",
+    "scop",
+    "darkly",
+    "snow-crash",
+    "rainfall",
+    "ft_linear_regression",
+]
+
+WORDS = [
+    "algorithm",
+    "allocation",
+    "binary",
+    "buffer",
+    "cluster",
+    "compiler",
+    "container",
+    "database",
+    "encryption",
+    "graphics",
+    "kernel",
+    "memory",
+    "network",
+    "parser",
+    "pipeline",
+    "process",
+    "protocol",
+    "renderer",
+    "scheduler",
+    "server",
+    "shell",
+    "signal",
+    "socket",
+    "thread",
+]
+
+
+def ensure_tags():
+    """Create every Language and Specialization choice that is missing"""
+    languages = [
+        Language.objects.get_or_create(name=name, defaults={"display_name": label})[0]
+        for name, label in Language.LANGUAGE_CHOICES
+    ]
+    specializations = [
+        Specialization.objects.get_or_create(
+            name=name, defaults={"display_name": label}
+        )[0]
+        for name, label in Specialization.SPECIALIZATION_CHOICES
+    ]
+    return languages, specializations
+
+
+def build_catalog(size, start=0, seed=42, batch_size=5000):
+    """Bulk-create `size` synthetic projects, each tagged with one language
+    and one specialization. Returns the created projects."""
+    rng = random.Random(seed)
+    languages, specializations = ensure_tags()
+
+    projects = []
+    for i in range(start, start + size):
+        slug = f"{SLUGS[i % len(SLUGS)]}-{i}"
+        projects.append(
+            Project(
+                project_id=1_000_000 + i,
+                name=slug.replace("-", " ").replace("_", " ").title(),
+                slug=slug,
+                description=" ".join(rng.choices(WORDS, k=40)),
+                difficulty=rng.randrange(0, 50_000),
+                objectives=rng.sample(WORDS, 3),
+                estimate_time=rng.choice([None, 10, 35, 70, 140, 210]),
+                solo=rng.random() < 0.5,
+                xp_points=rng.choice([None, 462, 1155, 2100, 9450, 25450]),
+                prerequisites=[],
+            )
+        )
+    projects = Project.objects.bulk_create(projects, batch_size=batch_size)
+
+    LanguageLink = Project.languages.through
+    SpecializationLink = Project.specializations.through
+    LanguageLink.objects.bulk_create(
+        [
+            LanguageLink(project_id=project.pk, language_id=rng.choice(languages).pk)
+            for project in projects
+        ],
+        batch_size=batch_size,
+    )
+    SpecializationLink.objects.bulk_create(
+        [
+            SpecializationLink(
+                project_id=project.pk, specialization_id=rng.choice(specializations).pk
+            )
+            for project in projects
+        ],
+        batch_size=batch_size,
+    )
+    Project.objects.filter(
+        project_id__range=(1_000_000 + start, 1_000_000 + start + size - 1)
+    ).update_search_vector()
+    return projects
+
+
+def build_api_pages(size, seed=42, per_page=100):
+    """Pages of synthetic 42 API project payloads, shaped like the ones
+    fetch_projects reads. Some carry skip keywords or too few campuses."""
+    rng = random.Random(seed)
+    prefixes = ["", "", "", "42cursus-", "old-", "exam-", "rushes-"]
+    projects = []
+    for i in range(size):
+        slug = f"{rng.choice(prefixes)}{SLUGS[i % len(SLUGS)]}-{i}"
+        projects.append(
+            {
+                "id": 1_000_000 + i,
+                "name": slug.replace("-", " ").replace("_", " ").title(),
+                "slug": slug,
+                "difficulty": rng.randrange(0, 50_000),
+                "campus": [
+                    {"id": campus}
+                    for campus in rng.sample(range(1, 80), k=rng.randint(1, 40))
+                ],
+                "project_sessions": [
+                    {
+                        "is_subscriptable": rng.random() < 0.8,
+                        "description": " ".join(rng.choices(WORDS, k=40)),
+                        "objectives": rng.sample(WORDS, 3),
+                        "estimate_time": f"{rng.choice([10, 35, 70])} hours",
+                        "solo": rng.random() < 0.5,
+                    }
+                ],
+            }
+        )
+    return [projects[i : i + per_page] for i in range(0, size, per_page)]
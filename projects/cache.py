@@ -0,0 +1,158 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = "projects:catalog_version"
+COUNTER_KEY = "projects:cache:{name}:{outcome}"
+COUNTED_CACHES = ["response", "facets"]
+
+
+def get_cache():
+    """Cache holding API responses, the catalog version and hit counters.
+    Configured by the `projects` alias in CACHES."""
+    return caches["projects"]
+
+
+def query_cache_key(prefix, params, ignore=(), scope=""):
+    """Cache key for a query string, independent of parameter order"""
+    items = sorted(
+        (key, value)
+        for key in params
+        if key not in ignore
+        for value in params.getlist(key)
+    )
+    digest = hashlib.md5(f"{scope}?{urlencode(items)}".encode()).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+def _fresh_version():
+    # Seeded from the clock so a version lost to eviction or a restart never
+    # comes back to a number that older entries were cached under.
+    return int(time.time() * 1000)
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _fresh_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached response at once"""
+    cache = get_cache()
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, _fresh_version(), timeout=None)
+
+
+def bump_catalog_version_on_commit():
+    # Bumping before the write is visible would let a concurrent request
+    # cache the old data under the new version.
+    transaction.on_commit(bump_catalog_version)
+
+
+def record(name, outcome):
+    cache = get_cache()
+    key = COUNTER_KEY.format(name=name, outcome=outcome)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def cache_stats():
+    """{cache name: {"hits": n, "misses": n}}"""
+    cache = get_cache()
+    return {
+        name: {
+            outcome: cache.get(COUNTER_KEY.format(name=name, outcome=outcome), 0)
+            for outcome in ["hits", "misses"]
+        }
+        for name in COUNTED_CACHES
+    }
+
+
+def cached_response(view_method):
+    """Cache the data of successful responses of a viewset action, keyed by
+    URL, normalized query string and the ETag set by `conditional_response`
+    (the catalog version when there is none). Responses for which
+    `view.is_personalized()` is true are never cached."""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if self.is_personalized(request):
+            return view_method(self, request, *args, **kwargs)
+        cache = get_cache()
+        # Keyed by the validators the response is sent with, a body is never
+        # served under an ETag computed from another catalog state, whatever
+        # process wrote to the catalog.
+        etag = getattr(self, "etag", None)
+        version = etag.strip('"') if etag else catalog_version()
+        key = query_cache_key(
+            f"projects:response:{version}",
+            request.query_params,
+            scope=request.build_absolute_uri(request.path),
+        )
+        data = cache.get(key)
+        if data is not None:
+            record("response", "hits")
+            return Response(data)
+
+        record("response", "misses")
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+        return response
+
+    return wrapper
+
+
+def conditional_response(view_method):
+    """Answer `If-None-Match`/`If-Modified-Since` with 304 before the view
+    runs, using the validators returned by `view.get_validators()`, and add
+    `ETag`/`Last-Modified` to successful responses. The ETag is left on
+    `view.etag` for `cached_response`. Personalized responses get no
+    validators and are marked private instead."""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if self.is_personalized(request):
+            response = view_method(self, request, *args, **kwargs)
+            patch_cache_control(response, private=True)
+            return response
+        etag, last_modified = self.get_validators(request, **kwargs)
+        self.etag = etag
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = None
+        if etag is not None:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+        if etag is not None and response.status_code in (200, 304):
+            # The ETag depends on the negotiated renderer.
+            patch_vary_headers(response, ["Accept"])
+            response.headers["ETag"] = etag
+            if timestamp is not None:
+                response.headers["Last-Modified"] = http_date(timestamp)
+        return response
+
+    return wrapper
@@ -0,0 +1,83 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, Func, IntegerField, OuterRef, Q
+from rest_framework import filters
+from rest_framework.exceptions import NotAuthenticated, ValidationError
+from rest_framework.settings import api_settings
+
+from .models import SEARCH_CONFIG, UserProjectStatus
+
+
+class NumNode(Func):
+    """Number of operators and terms left in a parsed tsquery"""
+
+    function = "numnode"
+    output_field = IntegerField()
+
+
+class ProjectSearchFilter(filters.SearchFilter):
+    """Full-text search on the stored `Project.search_vector`.
+
+    Every search term must match (as a prefix, so partially typed words
+    still hit) and results are ranked by relevance unless the client asked
+    for an explicit `?ordering=`. Searches made only of stopwords parse to an
+    empty tsquery, which matches nothing; they fall back to `icontains` on
+    the name and description, within the same query.
+    """
+
+    def get_search_words(self, request):
+        return re.findall(r"\w+", " ".join(self.get_search_terms(request)))
+
+    def get_search_query(self, words):
+        return SearchQuery(
+            " & ".join(f"{word}:*" for word in words),
+            search_type="raw",
+            config=SEARCH_CONFIG,
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        words = self.get_search_words(request)
+        if not words:
+            return queryset
+
+        query = self.get_search_query(words)
+        stopwords_only = Q(search_query_nodes=0)
+        for word in words:
+            stopwords_only &= Q(name__icontains=word) | Q(description__icontains=word)
+        queryset = (
+            queryset.alias(search_query_nodes=NumNode(query))
+            .filter(Q(search_vector=query) | stopwords_only)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+        )
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by("-rank", "name")
+        return queryset
+
+
+class UserStatusFilter(filters.BaseFilterBackend):
+    """`?status=finished|in_progress|available` against the imported 42
+    progress of the logged-in user.
+
+    A (NOT) EXISTS on the (user, status, project_id) index, so filtering
+    stays part of the single list query.
+    """
+
+    param = "status"
+    choices = [UserProjectStatus.FINISHED, UserProjectStatus.IN_PROGRESS, "available"]
+
+    def filter_queryset(self, request, queryset, view):
+        status = request.query_params.get(self.param)
+        if not status:
+            return queryset
+        if status not in self.choices:
+            raise ValidationError({self.param: f"Expected one of {self.choices}."})
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+
+        statuses = UserProjectStatus.objects.filter(
+            user=request.user, project_id=OuterRef("project_id")
+        )
+        if status == "available":
+            return queryset.filter(~Exists(statuses))
+        return queryset.filter(Exists(statuses.filter(status=status)))
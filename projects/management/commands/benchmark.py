@@ -0,0 +1,199 @@
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from projects.benchmarking.synthetic import build_api_pages, build_catalog
+from projects.filters import ProjectSearchFilter
+from projects.models import ClassificationRule, Language, Project, Specialization
+from projects.serializers import FastProjectSerializer, ProjectSerializer
+from projects.services.archive import replay_pages
+from projects.services.rules import RuleSet
+from projects.services.tagging import toggle_tag
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark catalog hot paths on a synthetic catalog. "
+        "Everything runs in a transaction that is rolled back."
+    )
+
+    suites = ["search", "serialize", "rules", "toggle"]
+    # Suites that run against a synthetic catalog in the database
+    catalog_suites = ["search", "serialize", "toggle"]
+
+    def add_arguments(self, parser):
+        parser.add_argument("suite", choices=self.suites, help="Benchmark to run")
+        parser.add_argument(
+            "--size", type=int, default=50_000, help="Synthetic catalog size"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Timed runs per case"
+        )
+        parser.add_argument(
+            "--archive",
+            metavar="PATH",
+            help="Project pages archived by fetch_projects --archive (rules suite)",
+        )
+        parser.add_argument(
+            "--selection",
+            type=int,
+            default=10_000,
+            help="Projects selected for each toggle (toggle suite)",
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        with transaction.atomic():
+            if options["suite"] in self.catalog_suites:
+                started = time.perf_counter()
+                build_catalog(options["size"])
+                self.stdout.write(
+                    f"Built {options['size']} synthetic projects in "
+                    f"{time.perf_counter() - started:.1f}s"
+                )
+            getattr(self, f"bench_{options['suite']}")(**options)
+            transaction.set_rollback(True)
+
+    def measure(self, label, func):
+        """Time `func` `self.repeat` times and print median and p95"""
+        func()  # warm-up
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        median = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"  {label:<28} median {median:8.2f} ms"
+            f"   p95 {p95:8.2f} ms   rows {result}"
+            f"   ({result / median * 1000:,.0f} rows/s)"
+        )
+
+    def bench_search(self, **options):
+        """Compare the legacy `icontains` SearchFilter with ranked full-text search"""
+        factory = APIRequestFactory()
+        legacy_view = SimpleNamespace(search_fields=["name", "description"])
+        queryset = Project.objects.defer("search_vector")
+
+        for term in ["kernel", "socket thread", "minishell", "transcendence"]:
+            request = Request(factory.get("/api/projects/", {"search": term}))
+            self.stdout.write(f"search={term!r}")
+            self.measure(
+                "icontains (SearchFilter)",
+                lambda: len(
+                    filters.SearchFilter().filter_queryset(
+                        request, queryset, legacy_view
+                    )
+                ),
+            )
+            self.measure(
+                "full-text (ranked)",
+                lambda: len(
+                    ProjectSearchFilter().filter_queryset(request, queryset, None)
+                ),
+            )
+
+    def bench_serialize(self, **options):
+        """Compare ProjectSerializer with the values()-based fast path"""
+        for fields in [ProjectSerializer.LIST_FIELDS, ProjectSerializer.Meta.fields]:
+            self.stdout.write(f"fields={len(fields)}")
+            self.measure(
+                "ProjectSerializer",
+                lambda: len(
+                    ProjectSerializer(
+                        Project.objects.prefetch_related(
+                            Prefetch("languages", Language.objects.order_by("name")),
+                            Prefetch(
+                                "specializations",
+                                Specialization.objects.order_by("name"),
+                            ),
+                        ),
+                        many=True,
+                        fields=fields,
+                    ).data
+                ),
+            )
+            fast = FastProjectSerializer(fields)
+            self.measure(
+                "FastProjectSerializer",
+                lambda: len(fast.serialize(fast.values(Project.objects.all()))),
+            )
+
+    def bench_rules(self, **options):
+        """Compare per-keyword substring scans with the compiled RuleSet, over
+        archived API pages or synthetic ones"""
+        if options["archive"]:
+            pages = replay_pages(options["archive"])
+        else:
+            pages = build_api_pages(options["size"])
+        projects = [project for page in pages for project in page]
+        self.stdout.write(f"{len(projects)} projects")
+
+        rules = list(ClassificationRule.objects.filter(enabled=True))
+        keywords = [r.pattern for r in rules if r.kind == r.SKIP_KEYWORD]
+        fragments = [r.pattern for r in rules if r.kind == r.SPECIALIZATION]
+
+        def scan():
+            fired = 0
+            for project in projects:
+                name = project.get("name", "").upper()
+                slug = project.get("slug", "")
+                if any(
+                    keyword.upper() in name or keyword.upper() in slug.upper()
+                    for keyword in keywords
+                ):
+                    fired += 1
+                elif any(fragment in slug for fragment in fragments):
+                    fired += 1
+            return len(projects)
+
+        def compiled():
+            ruleset = RuleSet(rules)
+            for project in projects:
+                slug = project.get("slug", "")
+                if not ruleset.skip_rule(project.get("name", ""), slug):
+                    ruleset.tags(slug)
+            return len(projects)
+
+        self.measure("substring scan", scan)
+        self.measure("compiled RuleSet", compiled)
+
+    def bench_toggle(self, **options):
+        """Compare the per-project admin toggle loop with the set-based
+        toggle_tag. Each run flips the tag, so runs alternate between adding
+        and removing it."""
+        pks = Project.objects.order_by("pk").values_list("pk", flat=True)
+        selection = Project.objects.filter(pk__in=list(pks[: options["selection"]]))
+        self.stdout.write(f"{selection.count()} projects selected")
+
+        for relation, model, name in [
+            ("languages", Language, "python"),
+            ("specializations", Specialization, "security"),
+        ]:
+            tag = model.objects.get(name=name)
+            self.stdout.write(f"{relation}={name}")
+
+            def loop():
+                projects = list(selection)
+                for project in projects:
+                    tags = getattr(project, relation)
+                    if tag in tags.all():
+                        tags.remove(tag)
+                    else:
+                        tags.add(tag)
+                return len(projects)
+
+            def set_based():
+                return sum(toggle_tag(selection, relation, tag))
+
+            self.measure("per-project loop", loop)
+            self.measure("set-based toggle_tag", set_based)
@@ -1,15 +1,94 @@
+from collections import Counter
+from contextlib import ExitStack, closing
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
-from projects.models import Project, Specialization
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from projects.models import ClassificationRule, Cursus, SyncState
 from projects.services.api_client import API42Client
+from projects.services.archive import PageArchive, replay_pages
+from projects.services.pipeline import Pipeline, merge
+from projects.services.rules import RuleSet
+from projects.services.sync import ProjectWriter
+from projects.signals import catalog_changed
+
+
+class CursusPage(list):
+    """Page of projects fetched from one cursus"""
+
+    def __init__(self, cursus_id, projects):
+        super().__init__(projects)
+        self.cursus_id = cursus_id
+
+
+class ReportSink:
+    """Debug sink listing left-out projects in one text file per reason,
+    projects outside the excluded campuses in `not_pt.txt` and the tag rules
+    that fired for each kept project in `tagged.txt`"""
+
+    reports = [
+        "low_campus",
+        "maybe_beta",
+        "not_subscritable",
+        "forbidden_keyword",
+        "not_pt",
+        "tagged",
+    ]
+
+    def __init__(self, command):
+        self.command = command
+
+    def __enter__(self):
+        self.files = {name: open(f"{name}.txt", "w") for name in self.reports}
+        return self
+
+    def __exit__(self, *exc_info):
+        for file in self.files.values():
+            file.close()
+
+    def __call__(self, items):
+        for data, reason, rules, _ in items:
+            slug = data.get("slug", "")
+            campus_ids = [campus.get("id") for campus in data.get("campus", [])]
+            if not self.command.rules.has_excluded_campus(campus_ids):
+                print(slug, file=self.files["not_pt"])
+            if reason == "low_campus":
+                print(f"{slug}, {len(data.get('campus', []))}", file=self.files[reason])
+            elif reason == "maybe_beta":
+                print(slug, file=self.files[reason])
+            elif reason == "forbidden_keyword":
+                print(
+                    f"{slug}, forbidden keyword {rules[0].pattern!r}",
+                    file=self.files[reason],
+                )
+            elif reason == "not_subscritable":
+                print(f"{slug}, not subscritable", file=self.files[reason])
+            elif reason is None and rules:
+                print(
+                    f"{slug}, {', '.join(map(str, rules))}", file=self.files["tagged"]
+                )
 
 
 class Command(BaseCommand):
     help = "Fetch Projects from 42 API and save to database"
 
+    # Upper bound of the `range[updated_at]` filter of incremental runs
+    range_end = "3000-01-01T00:00:00Z"
+    tag_relations = {
+        ClassificationRule.SPECIALIZATION: "specializations",
+        ClassificationRule.LANGUAGE: "languages",
+    }
+
     # to remove
     def add_arguments(self, parser):
         parser.add_argument(
-            "--cursus-id", type=int, default=21, help="Cursus ID to fetch projects from"
+            "--cursus-id",
+            type=int,
+            nargs="+",
+            default=[21],
+            help="Cursus IDs to fetch projects from, fetched concurrently",
         )
         parser.add_argument(
             "--limit", type=int, help="limit number of projects to fetch"
@@ -17,142 +96,283 @@ class Command(BaseCommand):
         parser.add_argument(
             "--debug", action="store_true", help="Create Debug Text Files"
         )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of pages fetched in parallel",
+        )
+        parser.add_argument(
+            "--buffer",
+            type=int,
+            default=4,
+            help="Pages buffered between pipeline stages",
+        )
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only fetch projects changed upstream since the last run",
+        )
+        mode.add_argument(
+            "--full",
+            action="store_true",
+            help="Fetch the whole cursus (the default) and reset the watermark",
+        )
+        mode.add_argument(
+            "--from-archive",
+            metavar="PATH",
+            help="Replay pages from an archive written by --archive, offline",
+        )
+        parser.add_argument(
+            "--archive",
+            metavar="PATH",
+            help="Append the raw API pages to this gzip JSON Lines archive",
+        )
+        parser.add_argument(
+            "--full-every",
+            type=int,
+            default=7,
+            help="Days after which --incremental runs a full sync instead",
+        )
 
     def handle(self, *args, **options):
-        client = API42Client()
-        cursus_id = options["cursus_id"]
+        cursus_ids = list(dict.fromkeys(options["cursus_id"]))
         limit = options["limit"]
         debug = options.get("debug", True)
+        replay = options["from_archive"]
+        full_every = timedelta(days=options["full_every"])
+        states = {}
+        for cursus_id in cursus_ids:
+            Cursus.objects.get_or_create(cursus_id=cursus_id)
+            states[cursus_id], _ = SyncState.objects.get_or_create(cursus_id=cursus_id)
+        incremental = {
+            cursus_id
+            for cursus_id, state in states.items()
+            if options["incremental"] and not state.full_sync_due(full_every)
+        }
+        params = {cursus_id: {} for cursus_id in cursus_ids}
+        for cursus_id in incremental:
+            params[cursus_id][
+                "range[updated_at]"
+            ] = f"{states[cursus_id].watermark.isoformat()},{self.range_end}"
+
+        for cursus_id in cursus_ids:
+            if replay:
+                self.stdout.write(
+                    f"Replaying projects from cursus {cursus_id} archived in {replay}"
+                )
+            elif cursus_id in incremental:
+                self.stdout.write(
+                    f"Fetching projects from cursus {cursus_id} "
+                    f"changed since {states[cursus_id].watermark.isoformat()}"
+                )
+            else:
+                self.stdout.write(f"Fetching projects from cursus {cursus_id}")
 
-        self.stdout.write(f"Fetching projects from cursus {cursus_id}")
+        # Filled in by the dedupe stage
+        self.watermarks = {
+            cursus_id: state.watermark for cursus_id, state in states.items()
+        }
+        self.memberships = {}
+        self.versions = {}
 
-        try:
-            page = 1
-            total_created = 0
-            total_updated = 0
+        with ExitStack() as stack:
+            if not replay:
+                # One client, so every cursus shares its rate limits and token
+                client = API42Client()
+                stack.callback(client.close)
+                # Settle the token on this thread, so runs shorter than its
+                # lifetime never read the token table from pipeline threads.
+                client.token()
+            archive = None
+            if options["archive"]:
+                archive = stack.enter_context(PageArchive(options["archive"]))
+            sources = []
+            for cursus_id in cursus_ids:
+                if replay:
+                    pages = replay_pages(replay, cursus_id=cursus_id)
+                else:
+                    pages = client.iter_pages(
+                        f"/v2/cursus/{cursus_id}/projects",
+                        params[cursus_id],
+                        per_page=100,
+                        concurrency=options["concurrency"],
+                    )
+                if archive:
+                    pages = archive.pages(
+                        pages, cursus_id=cursus_id, params=params[cursus_id]
+                    )
+                sources.append(self._cursus_pages(cursus_id, pages))
+            source = merge(sources, buffer=options["buffer"])
 
+            writer = ProjectWriter()
+            self.rules = RuleSet.load()
+            fired = Counter()
+            sinks = [
+                lambda items: writer.write([row for *_, row in items if row]),
+                lambda items: fired.update(
+                    str(rule) for _, _, rules, _ in items for rule in rules
+                ),
+            ]
             if debug:
-                with (
-                    open("low_campus.txt", "w") as low,
-                    open("maybe_beta.txt", "w") as beta,
-                    open("not_subscritable.txt", "w") as subs,
-                    open("forbidden_keyword.txt", "w") as forb,
-                    open("not_pt.txt", "w") as pt,
-                ):
-                    while True:
-                        params = {
-                            "page": page,
-                            "per_page": 100,
-                        }
-                        if limit and total_created + total_updated >= limit:
-                            break
-                        projects_data = client.get(
-                            f"/v2/cursus/{cursus_id}/projects", params
-                        )
+                sinks.append(stack.enter_context(ReportSink(self)))
+            pipeline = Pipeline(
+                source,
+                [
+                    ("dedupe", self._dedupe_page),
+                    ("classify", self._classify_page),
+                    ("transform", lambda items: self._transform_page(items, writer)),
+                ],
+                buffer=options["buffer"],
+                sink_name="write",
+            )
+            pages = iter(pipeline)
 
-                        if not projects_data:
-                            break
-                        for project_data in projects_data:
-                            if not self._has_excluded_campus(project_data):
-                                print(f"{project_data.get('slug', '')}", file=pt)
-                            # Check beta and low campus projects
-                            # 9 is the number of campuses that microsoft's projects have
-                            if len(project_data.get("campus", [])) < 9:
-                                if self._extract_subscriptable(project_data):
-                                    print(f"{project_data.get('slug', '')}", file=beta)
-                                else:
-                                    print(
-                                        f"{project_data.get('slug', '')}, {
-                                            len(project_data.get('campus', []))
-                                        }",
-                                        file=low,
-                                    )
-                                continue
-                            if self._should_skip_project(project_data):
-                                print(
-                                    f"{
-                                        project_data.get('slug', '')
-                                    }, forbidden keyword",
-                                    file=forb,
-                                )
-                                continue
-                            if not self._extract_subscriptable(project_data):
-                                print(
-                                    f"{project_data.get('slug', '')}, not subscritable",
-                                    file=subs,
-                                )
-                                continue
-                            created, updated = self._save_project(project_data)
-                            if created:
-                                total_created += 1
-                            if updated:
-                                total_updated += 1
-
-                            if limit and total_created + total_updated >= limit:
-                                break
-                        page += 1
-                        self.stdout.write(f"Processed page {page - 1}....")
+            try:
+                with transaction.atomic():
+                    complete = False
+                    for page, items in enumerate(pages, start=1):
+                        if limit:
+                            items = self._take(items, limit - writer.processed)
+                        for sink in sinks:
+                            sink(items)
+                        self.stdout.write(f"Processed page {page}....")
                         self.stdout.write(
                             self.style.SUCCESS(
-                                f"Successfully processed projects: {
-                                    total_created
-                                } created, {total_updated} updated"
+                                f"Successfully processed projects: "
+                                f"{writer.created} created, {writer.updated} updated, "
+                                f"{writer.unchanged} unchanged"
                             )
                         )
-            else:
-                while True:
-                    params = {
-                        "page": page,
-                        "per_page": 100,
-                    }
-                    if limit and total_created + total_updated >= limit:
-                        break
-                    projects_data = client.get(
-                        f"/v2/cursus/{cursus_id}/projects", params
-                    )
-
-                    if not projects_data:
-                        break
-                    for project_data in projects_data:
-                        # Check beta and low campus projects
-                        # 9 is the number of campuses that microsoft's projects have
-                        if len(project_data.get("campus", [])) < 9:
-                            continue
-                        if self._should_skip_project(project_data):
-                            continue
-                        if not self._extract_subscriptable(project_data):
-                            continue
-                        created, updated = self._save_project(project_data)
-                        if created:
-                            total_created += 1
-                        if updated:
-                            total_updated += 1
-
-                        if limit and total_created + total_updated >= limit:
+                        if limit and writer.processed >= limit:
                             break
-                    page += 1
-                    self.stdout.write(f"Processed page {page - 1}....")
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"Successfully processed projects: {
-                                total_created
-                            } created, {total_updated} updated"
-                        )
-                    )
-        except Exception as e:
-            self.stderr.write(self.style.ERROR(f"Error fetching projects: {str(e)}"))
+                    else:
+                        complete = True
+                        # Only a complete run may move the watermarks forward.
+                        if not replay:
+                            for cursus_id, state in states.items():
+                                self._save_state(
+                                    state,
+                                    self.watermarks[cursus_id],
+                                    full=cursus_id not in incremental,
+                                )
+                    # A complete full sync lists every project of its cursus.
+                    exact = [] if replay or not complete else set(states) - incremental
+                    added, removed = writer.write_cursus(self.memberships, exact)
+                    self.stdout.write(f"Cursus links: {added} added, {removed} removed")
+            except Exception as e:
+                self.stderr.write(
+                    self.style.ERROR(f"Error fetching projects: {str(e)}")
+                )
+            finally:
+                pages.close()
+                catalog_changed.send(sender=self.__class__)
+                self.stdout.write("Pipeline stages:")
+                for stats in pipeline.stats:
+                    self.stdout.write(f"  {stats}")
+                self.stdout.write("Rules fired:")
+                for rule, count in fired.most_common():
+                    self.stdout.write(f"  {count:>6}  {rule}")
+
+    def _cursus_pages(self, cursus_id, pages):
+        with closing(pages):
+            for projects_data in pages:
+                yield CursusPage(cursus_id, projects_data)
+
+    def _dedupe_page(self, projects_data):
+        """Projects of a cursus page not seen earlier in the run, or seen in
+        an older upstream version.
+
+        Records the cursus of every project and the newest upstream update of
+        every cursus on the way, so projects shared by several cursus are
+        classified and written once, in their newest version, even when
+        cursus replayed from an archive come from different runs.
+        """
+        cursus_id = projects_data.cursus_id
+        self.watermarks[cursus_id] = self._newest_update(
+            projects_data, self.watermarks[cursus_id]
+        )
+        fresh = []
+        for data in projects_data:
+            cursus = self.memberships.setdefault(data["id"], set())
+            updated_at = parse_datetime(data.get("updated_at") or "")
+            seen = self.versions.get(data["id"])
+            if not cursus or (updated_at and (seen is None or updated_at > seen)):
+                fresh.append(data)
+                self.versions[data["id"]] = updated_at
+            cursus.add(cursus_id)
+        return fresh
+
+    def _classify_page(self, projects_data):
+        return [(data, *self._classify(data)) for data in projects_data]
+
+    def _transform_page(self, items, writer):
+        return [
+            (
+                data,
+                reason,
+                rules,
+                None if reason else self._project_row(data, rules, writer),
+            )
+            for data, reason, rules in items
+        ]
+
+    def _take(self, items, remaining):
+        """Items up to the `remaining`-th project to save"""
+        for index, (*_, row) in enumerate(items):
+            if row:
+                remaining -= 1
+                if remaining < 0:
+                    return items[:index]
+        return items
 
-    def _save_project(self, data):
-        """Save or update project form API data"""
-        specialization_name = self._get_specialization(data)
-        defaults = {
+    def _newest_update(self, projects_data, watermark):
+        """Latest upstream `updated_at` among a page and `watermark`"""
+        for project_data in projects_data:
+            updated_at = parse_datetime(project_data.get("updated_at") or "")
+            if updated_at and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+        return watermark
+
+    def _save_state(self, state, watermark, full):
+        state.watermark = watermark
+        state.last_sync_at = timezone.now()
+        if full:
+            state.last_full_sync_at = state.last_sync_at
+        state.save()
+
+    def _classify(self, data):
+        """(reason to leave the project out or None, rules that fired)"""
+        rules = self.rules
+        # Check beta and low campus projects
+        if len(data.get("campus", [])) < rules.min_campuses:
+            if self._extract_subscriptable(data):
+                return "maybe_beta", [rules.min_campuses_rule]
+            return "low_campus", [rules.min_campuses_rule]
+        skip = rules.skip_rule(data.get("name", ""), data.get("slug", ""))
+        if skip:
+            return "forbidden_keyword", [skip]
+        if not self._extract_subscriptable(data):
+            return "not_subscritable", []
+        slug = data.get("slug", "")
+        return None, [
+            rule
+            for relation in rules.tag_rules
+            for rule in rules.tag_rules_for(relation, slug)
+        ]
+
+    def _project_row(self, data, rules, writer):
+        """(fields, tags) for `ProjectWriter` from API data"""
+        fields = {
+            "project_id": data["id"],
             "name": data.get("name", ""),
             "slug": data.get("slug", ""),
             "description": self._extract_description(data),
             "difficulty": data.get("difficulty", 0),
-            "parent_name": data.get("parent", {}).get("name")
-            if data.get("parent")
-            else None,
+            "parent_name": (
+                data.get("parent", {}).get("name") if data.get("parent") else None
+            ),
             "objectives": self._extract_objectives(data),
             "estimate_time": self._parse_estimate_time(data),
             "solo": self._determine_solo_status(data),
@@ -160,17 +380,12 @@ class Command(BaseCommand):
             "prerequisites": self._extract_prerequisites(data),
             "subject_download_url": self._get_subject_url(data),
         }
-        print(f"trying to save {defaults.get('slug', '')}")
-        project, created = Project.objects.update_or_create(
-            project_id=data["id"], defaults=defaults
-        )
-        if specialization_name == "Common Core":
-            try:
-                specialization = Specialization.objects.get(name="common_core")
-                project.specializations.set([specialization])
-            except Specialization.DoesNotExist:
-                pass
-        return created, not created
+        tags = {}
+        for rule in rules:
+            relation = self.tag_relations[rule.kind]
+            if rule.target in writer.tags[relation]:
+                tags.setdefault(relation, []).append(rule.target)
+        return fields, tags
 
     def _parse_estimate_time(self, data):
         """Convert estimation string into hours integer"""
@@ -222,76 +437,3 @@ class Command(BaseCommand):
             if attachment.get("name", "").endswith(".pdf"):
                 return attachment.get("url")
         return None
-
-    def _get_specialization(self, data):
-        slug = data.get("slug", "")
-
-        # Common core projects
-        common_core_slugs = [
-            "libft",
-            "get_next_line",
-            "fractol",
-            "FdF",
-            "minitalk",
-            "miniRT",
-            "ft_printf",
-            "born2beroot",
-            "pipex",
-            "minishell",
-            "philosophers",
-            "cub3d",
-            "so-long",
-            "netpractice",
-            "cpp-module",
-            "inception",
-            "webserv",
-            "ft_irc",
-            "transcendence",
-        ]
-
-        for core_slug in common_core_slugs:
-            if core_slug in slug:
-                return "Common Core"
-        return "42 Advanced"
-
-    def _should_skip_project(self, data):
-        """Skip projects with excluded keywords"""
-        excluded_keywords = [
-            "TEST",
-            "RNCP",
-            "Apprentissage",
-            "Internship",
-            "startup",
-            "work-experience",
-            "exam",
-            "Rushes",
-            "hive",
-            "maillard",
-            "42Québec",
-            "42_collaborative_resume",
-            "deprecated",
-            "java",
-            "part_time",
-            "old",
-            "Electronique",
-            "abstract-vm",
-            "ft_containers",
-            "ft_script",
-            "ft_select",
-            "ft_server",
-            "tinky-winkey",
-            "gbmu",
-        ]
-        name = data.get("name", "").upper()
-        slug = data.get("slug", "").upper()
-        return any(
-            keyword.upper() in name or keyword.upper() in slug
-            for keyword in excluded_keywords
-        )
-
-    def _has_excluded_campus(self, data):
-        """Check if project has excluded campus IDs (38: Lisboa, 58: Porto)"""
-        campus_list = data.get("campus", [])
-        excluded_campus_ids = [38, 58]  # Lisboa and Porto
-
-        return any(campus.get("id") in excluded_campus_ids for campus in campus_list)
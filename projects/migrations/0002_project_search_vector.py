@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:43
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+
+def populate_search_vector(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    SearchVector = django.contrib.postgres.search.SearchVector
+    Project.objects.update(
+        search_vector=SearchVector('name', weight='A', config='english')
+        + SearchVector('description', weight='B', config='english')
+        + SearchVector(Cast('objectives', models.TextField()), weight='C', config='english')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='project_search_vector_idx'),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0005_project_updated_at_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("project_pk", models.BigIntegerField(unique=True)),
+                ("project_id", models.IntegerField()),
+                ("deleted_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
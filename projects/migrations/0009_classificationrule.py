@@ -0,0 +1,116 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+# The rules fetch_projects used to hard-code
+SKIP_KEYWORDS = [
+    "TEST",
+    "RNCP",
+    "Apprentissage",
+    "Internship",
+    "startup",
+    "work-experience",
+    "exam",
+    "Rushes",
+    "hive",
+    "maillard",
+    "42Québec",
+    "42_collaborative_resume",
+    "deprecated",
+    "java",
+    "part_time",
+    "old",
+    "Electronique",
+    "abstract-vm",
+    "ft_containers",
+    "ft_script",
+    "ft_select",
+    "ft_server",
+    "tinky-winkey",
+    "gbmu",
+]
+COMMON_CORE_SLUGS = [
+    "libft",
+    "get_next_line",
+    "fractol",
+    "FdF",
+    "minitalk",
+    "miniRT",
+    "ft_printf",
+    "born2beroot",
+    "pipex",
+    "minishell",
+    "philosophers",
+    "cub3d",
+    "so-long",
+    "netpractice",
+    "cpp-module",
+    "inception",
+    "webserv",
+    "ft_irc",
+    "transcendence",
+]
+MIN_CAMPUSES = 9  # the number of campuses that microsoft's projects have
+EXCLUDED_CAMPUSES = [38, 58]  # Lisboa and Porto
+
+
+def seed_rules(apps, schema_editor):
+    ClassificationRule = apps.get_model("projects", "ClassificationRule")
+    rules = [
+        ClassificationRule(kind="skip_keyword", pattern=keyword)
+        for keyword in SKIP_KEYWORDS
+    ]
+    rules += [
+        ClassificationRule(kind="specialization", pattern=slug, target="common_core")
+        for slug in COMMON_CORE_SLUGS
+    ]
+    rules.append(ClassificationRule(kind="min_campuses", pattern=str(MIN_CAMPUSES)))
+    rules += [
+        ClassificationRule(kind="excluded_campus", pattern=str(campus))
+        for campus in EXCLUDED_CAMPUSES
+    ]
+    ClassificationRule.objects.bulk_create(rules)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0008_project_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClassificationRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("skip_keyword", "Skip keyword (name or slug)"),
+                            ("specialization", "Slug to specialization"),
+                            ("language", "Slug to language"),
+                            ("min_campuses", "Minimum number of campuses"),
+                            ("excluded_campus", "Excluded campus id"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("pattern", models.CharField(max_length=100)),
+                ("target", models.CharField(blank=True, max_length=50)),
+                ("enabled", models.BooleanField(default=True)),
+            ],
+            options={
+                "ordering": ["kind", "pattern"],
+            },
+        ),
+        migrations.RunPython(seed_rules, migrations.RunPython.noop),
+    ]
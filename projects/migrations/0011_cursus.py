@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0010_apitoken"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Cursus",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cursus_id", models.IntegerField(unique=True)),
+                ("name", models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                "verbose_name_plural": "cursus",
+            },
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="cursus",
+            field=models.ManyToManyField(
+                blank=True, related_name="projects", to="projects.cursus"
+            ),
+        ),
+    ]
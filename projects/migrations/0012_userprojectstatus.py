@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0011_cursus"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserProjectStatus",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("project_id", models.IntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("finished", "Finished"),
+                            ("in_progress", "In progress"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("status_42", models.CharField(blank=True, max_length=50)),
+                ("final_mark", models.IntegerField(blank=True, null=True)),
+                ("validated", models.BooleanField(blank=True, null=True)),
+                ("marked_at", models.DateTimeField(blank=True, null=True)),
+                ("imported_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="project_statuses",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "user project statuses",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "status", "project_id"],
+                        name="user_project_status_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "project_id"), name="user_project_status_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+# Stamp every written project and tombstone with the id of the writing
+# transaction, however it was written (save, update, bulk upsert).
+CREATE_TRIGGERS = """
+CREATE FUNCTION projects_set_change_txid() RETURNS trigger AS $$
+BEGIN
+    NEW.change_txid := txid_current();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER projects_project_change_txid
+    BEFORE INSERT OR UPDATE ON projects_project
+    FOR EACH ROW EXECUTE FUNCTION projects_set_change_txid();
+
+CREATE TRIGGER projects_projecttombstone_change_txid
+    BEFORE INSERT OR UPDATE ON projects_projecttombstone
+    FOR EACH ROW EXECUTE FUNCTION projects_set_change_txid();
+
+UPDATE projects_project SET change_txid = txid_current();
+UPDATE projects_projecttombstone SET change_txid = txid_current();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER projects_projecttombstone_change_txid ON projects_projecttombstone;
+DROP TRIGGER projects_project_change_txid ON projects_project;
+DROP FUNCTION projects_set_change_txid();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0012_userprojectstatus"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="change_txid",
+            field=models.BigIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="projecttombstone",
+            name="change_txid",
+            field=models.BigIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
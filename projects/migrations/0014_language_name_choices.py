@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0013_change_txid"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="language",
+            name="name",
+            field=models.CharField(
+                choices=[
+                    ("c", "C"),
+                    ("cpp", "C++"),
+                    ("python", "Python"),
+                    ("ocaml", "OCaml"),
+                    ("java", "Java"),
+                    ("compiled_languages", "Compiled Languages"),
+                    ("shell", "Shell"),
+                    ("php", "PHP"),
+                    ("csharp", "C#"),
+                    ("kotlin", "Kotlin"),
+                    ("swift", "Swift"),
+                    ("dart", "Dart/Flutter"),
+                    ("zig", "Zig"),
+                    ("ruby", "Ruby"),
+                    ("javascript", "JavaScript"),
+                    ("go", "Go"),
+                    ("assembly", "Assembly"),
+                    ("rust", "Rust"),
+                    ("undefined", "Undefined"),
+                    ("na", "Not Applicable"),
+                ],
+                max_length=50,
+                unique=True,
+            ),
+        ),
+    ]
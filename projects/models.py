@@ -1,4 +1,12 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+SEARCH_CONFIG = "english"
 
 
 class Language(models.Model):
@@ -51,6 +59,34 @@ class Specialization(models.Model):
         return self.display_name
 
 
+class Cursus(models.Model):
+    """42 cursus whose projects are synced by fetch_projects"""
+
+    cursus_id = models.IntegerField(unique=True)
+    name = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        verbose_name_plural = "cursus"
+
+    def __str__(self):
+        return self.name or f"Cursus {self.cursus_id}"
+
+
+class ProjectQuerySet(models.QuerySet):
+    def update_search_vector(self):
+        """Recompute the stored search vector: name ranks above description,
+        which ranks above objectives"""
+        return self.update(
+            search_vector=SearchVector("name", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+            + SearchVector(
+                Cast("objectives", models.TextField()),
+                weight="C",
+                config=SEARCH_CONFIG,
+            )
+        )
+
+
 class Project(models.Model):
     project_id = models.IntegerField(unique=True)
     name = models.CharField(max_length=100)
@@ -66,8 +102,179 @@ class Project(models.Model):
     subject_download_url = models.URLField(blank=True, null=True)
     languages = models.ManyToManyField(Language, blank=True)
     specializations = models.ManyToManyField(Specialization, blank=True)
+    cursus = models.ManyToManyField(Cursus, blank=True, related_name="projects")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+    # Digest of the upstream data last written by fetch_projects
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Transaction that last wrote the row, set by a database trigger
+    change_txid = models.BigIntegerField(null=True, editable=False, db_index=True)
+
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="project_search_vector_idx"),
+            GinIndex(
+                fields=["name"],
+                opclasses=["gin_trgm_ops"],
+                name="project_name_trgm_idx",
+            ),
+            GinIndex(
+                fields=["slug"],
+                opclasses=["gin_trgm_ops"],
+                name="project_slug_trgm_idx",
+            ),
+            # Conditional GET validators read max(updated_at).
+            models.Index(fields=["updated_at"], name="project_updated_at_idx"),
+            # Keyset pagination seeks on (ordering field, id).
+            models.Index(fields=["name", "id"], name="project_name_id_idx"),
+            models.Index(fields=["xp_points", "id"], name="project_xp_points_id_idx"),
+            models.Index(
+                fields=["estimate_time", "id"], name="project_estimate_time_id_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ProjectTombstone(models.Model):
+    """Record of a deleted project, so change feeds can report removals"""
+
+    project_pk = models.BigIntegerField(unique=True)
+    project_id = models.IntegerField()
+    deleted_at = models.DateTimeField(db_index=True)
+    # Transaction that recorded the deletion, set by a database trigger
+    change_txid = models.BigIntegerField(null=True, editable=False, db_index=True)
+
+    def __str__(self):
+        return f"{self.project_id} (deleted {self.deleted_at:%Y-%m-%d})"
+
+
+class SyncState(models.Model):
+    """Progress of `fetch_projects` for one cursus"""
+
+    cursus_id = models.IntegerField(unique=True)
+    # Newest upstream `updated_at` seen by a complete run
+    watermark = models.DateTimeField(blank=True, null=True)
+    last_sync_at = models.DateTimeField(blank=True, null=True)
+    last_full_sync_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"cursus {self.cursus_id} (up to {self.watermark})"
+
+    def full_sync_due(self, interval):
+        """Whether an incremental run should reconcile the whole cursus
+        instead, because there is no watermark or the last full run is older
+        than `interval`"""
+        return (
+            self.watermark is None
+            or self.last_full_sync_at is None
+            or self.last_full_sync_at <= timezone.now() - interval
+        )
+
+
+class ClassificationRule(models.Model):
+    """Rule used by `fetch_projects` to filter and tag upstream projects"""
+
+    SKIP_KEYWORD = "skip_keyword"
+    SPECIALIZATION = "specialization"
+    LANGUAGE = "language"
+    MIN_CAMPUSES = "min_campuses"
+    EXCLUDED_CAMPUS = "excluded_campus"
+    KIND_CHOICES = [
+        (SKIP_KEYWORD, "Skip keyword (name or slug)"),
+        (SPECIALIZATION, "Slug to specialization"),
+        (LANGUAGE, "Slug to language"),
+        (MIN_CAMPUSES, "Minimum number of campuses"),
+        (EXCLUDED_CAMPUS, "Excluded campus id"),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    pattern = models.CharField(max_length=100)
+    # Specialization or Language name for tagging rules
+    target = models.CharField(max_length=50, blank=True)
+    enabled = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ["kind", "pattern"]
+
+    def __str__(self):
+        if self.target:
+            return f"{self.kind} {self.pattern!r} -> {self.target}"
+        return f"{self.kind} {self.pattern!r}"
+
+    def clean(self):
+        # RuleSet.load() must never fail, or every sync would.
+        if self.kind in (self.MIN_CAMPUSES, self.EXCLUDED_CAMPUS):
+            if not self.pattern.isdecimal():
+                raise ValidationError({"pattern": "Enter a whole number."})
+        tag_models = {self.SPECIALIZATION: Specialization, self.LANGUAGE: Language}
+        if self.kind in tag_models:
+            model = tag_models[self.kind]
+            if not model.objects.filter(name=self.target).exists():
+                raise ValidationError(
+                    {
+                        "target": f"Enter the name of an existing "
+                        f"{model._meta.verbose_name}."
+                    }
+                )
+
+
+class ApiToken(models.Model):
+    """OAuth access token shared by every API42Client process"""
+
+    key = models.CharField(max_length=255, unique=True)
+    access_token = models.CharField(max_length=255, blank=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.key} (expires {self.expires_at})"
+
+
+class UserProjectStatus(models.Model):
+    """Progress of a user on a 42 project, imported from `projects_users`.
+
+    Keyed by the 42 `project_id` rather than a foreign key, so progress on
+    projects outside the catalog is kept for when they join it.
+    """
+
+    FINISHED = "finished"
+    IN_PROGRESS = "in_progress"
+    STATUS_CHOICES = [
+        (FINISHED, "Finished"),
+        (IN_PROGRESS, "In progress"),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="project_statuses",
+    )
+    project_id = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    # Raw `projects_users` status, e.g. "waiting_for_correction"
+    status_42 = models.CharField(max_length=50, blank=True)
+    final_mark = models.IntegerField(blank=True, null=True)
+    validated = models.BooleanField(blank=True, null=True)
+    marked_at = models.DateTimeField(blank=True, null=True)
+    imported_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "user project statuses"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "project_id"], name="user_project_status_unique"
+            ),
+        ]
+        indexes = [
+            # ?status= probes (user, status, project_id) for each project.
+            models.Index(
+                fields=["user", "status", "project_id"],
+                name="user_project_status_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.project_id}: {self.status}"
@@ -0,0 +1,165 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import filters
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _is_integer(value):
+    # JSON booleans decode to bool, a subclass of int
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class KeysetPagination(BasePagination):
+    """Opt-in keyset (cursor) pagination.
+
+    Clients that send neither `?page_size=` nor `?cursor=` get the plain,
+    unpaginated list. Otherwise pages are ordered by the first `?ordering=`
+    term with `id` as a tiebreaker, and each page seeks past the previous
+    one with a `WHERE (field, id) > (value, pk)` style filter instead of an
+    OFFSET, so deep pages cost the same as the first. NULLs follow
+    PostgreSQL's defaults (last when ascending, first when descending) so
+    the composite `(field, id)` indexes serve both directions.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 500
+    tiebreaker = "id"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_param = request.query_params.get(self.cursor_query_param)
+        if (
+            cursor_param is None
+            and self.page_size_query_param not in request.query_params
+        ):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(cursor_param) if cursor_param else None
+        reverse = bool(cursor and cursor["r"])
+
+        self.count = queryset.count()
+        descending = self.ordering.startswith("-") != reverse
+        queryset = queryset.order_by(*self.get_order_terms(descending))
+        if cursor:
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(cursor["v"], cursor["id"], descending)
+                )
+            except (TypeError, ValueError, ValidationError):
+                # A value the ordering field cannot hold
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+        self.next_position = self.get_position(rows[-1]) if rows and has_next else None
+        self.previous_position = (
+            self.get_position(rows[0]) if rows and has_previous else None
+        )
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "next": self.get_link(self.next_position, reverse=False),
+                "previous": self.get_link(self.previous_position, reverse=True),
+                "results": data,
+            }
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        """First valid `?ordering=` term, falling back to the view default"""
+        ordering = filters.OrderingFilter().get_ordering(request, queryset, view)
+        return ordering[0] if ordering else self.tiebreaker
+
+    @property
+    def field(self):
+        return self.ordering.lstrip("-")
+
+    def get_order_terms(self, descending):
+        prefix = "-" if descending else ""
+        if self.field == self.tiebreaker:
+            return [prefix + self.tiebreaker]
+        return [prefix + self.field, prefix + self.tiebreaker]
+
+    def get_keyset_filter(self, value, pk, descending):
+        """Rows strictly after (value, pk) in the current sort order"""
+        field, tie = self.field, self.tiebreaker
+        after = "lt" if descending else "gt"
+        if field == tie:
+            return Q(**{f"{tie}__{after}": pk})
+        if value is None:
+            # NULLs sort last ascending and first descending.
+            if descending:
+                return Q(**{f"{field}__isnull": True, f"{tie}__lt": pk}) | Q(
+                    **{f"{field}__isnull": False}
+                )
+            return Q(**{f"{field}__isnull": True, f"{tie}__gt": pk})
+        condition = Q(**{f"{field}__{after}": value}) | Q(
+            **{field: value, f"{tie}__{after}": pk}
+        )
+        if not descending:
+            condition |= Q(**{f"{field}__isnull": True})
+        return condition
+
+    def get_position(self, row):
+        if isinstance(row, dict):
+            return row[self.field], row[self.tiebreaker]
+        return getattr(row, self.field), getattr(row, self.tiebreaker)
+
+    def encode_cursor(self, position, reverse):
+        value, pk = position
+        payload = {"o": self.ordering, "v": value, "id": pk, "r": reverse}
+        return base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode()
+        ).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            value = cursor["v"]
+            valid = (
+                cursor["o"] == self.ordering
+                and _is_integer(cursor["id"])
+                and isinstance(cursor["r"], bool)
+                and (value is None or isinstance(value, str) or _is_integer(value))
+            )
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            valid = False
+        if not valid:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(position, reverse)
+        )
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from .models import Project, Language, Specialization
 
@@ -14,7 +16,34 @@ class SpecializationSerializer(serializers.ModelSerializer):
         fields = ["name", "display_name"]
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Accept a `fields` argument that restricts which fields are serialized"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Default list representation: everything but the large text/JSON columns.
+    LIST_FIELDS = [
+        "id",
+        "project_id",
+        "name",
+        "slug",
+        "parent_name",
+        "estimate_time",
+        "solo",
+        "xp_points",
+        "subject_download_url",
+        "languages",
+        "specializations",
+        "created_at",
+        "updated_at",
+    ]
+
     languages = LanguageSerializer(many=True, read_only=True)
     specializations = SpecializationSerializer(many=True, read_only=True)
 
@@ -39,3 +68,85 @@ class ProjectSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
+
+
+class FastProjectSerializer:
+    """Read-only fast path producing exactly what `ProjectSerializer` emits.
+
+    Rows come from `values()` instead of model instances, and each nested
+    relation is read with a single `values_list()` query on its through
+    table, grouped by project in Python. Field conversions are taken from a
+    `ProjectSerializer` instance, so both paths cannot drift apart; only
+    fields whose DRF representation is the identity on database values are
+    passed through untouched.
+    """
+
+    passthrough = (
+        serializers.BooleanField,
+        serializers.CharField,
+        serializers.IntegerField,
+        serializers.JSONField,
+    )
+
+    def __init__(self, fields=None):
+        reference = ProjectSerializer(fields=fields)
+        self.fields = list(reference.fields)
+        self.converters = {}
+        self.relations = {}
+        for name, field in reference.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                self.relations[name] = list(field.child.fields)
+            elif not isinstance(field, self.passthrough):
+                self.converters[name] = field.to_representation
+        self.columns = [name for name in self.fields if name not in self.relations]
+
+    def values(self, queryset, extra=()):
+        """Row queryset for `queryset`, with `extra` columns (e.g. the ones a
+        paginator needs) loaded but not serialized"""
+        columns = dict.fromkeys(["id", *self.columns, *extra])
+        return queryset.prefetch_related(None).values(*columns)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        related = {
+            name: self.group_related(name, nested, [row["id"] for row in rows])
+            for name, nested in self.relations.items()
+        }
+        converters = self.converters
+        data = []
+        for row in rows:
+            item = {}
+            for name in self.fields:
+                if name in related:
+                    item[name] = related[name].get(row["id"], [])
+                    continue
+                value = row[name]
+                if value is not None and name in converters:
+                    value = converters[name](value)
+                item[name] = value
+            data.append(item)
+        return data
+
+    def group_related(self, name, nested, project_ids):
+        """{project pk: [nested dicts]} for one many-to-many relation, in the
+        same order as the prefetch used by the DRF path"""
+        field = Project._meta.get_field(name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        links = (
+            field.remote_field.through.objects.filter(
+                **{f"{source}_id__in": project_ids}
+            )
+            .order_by(f"{target}__name")
+            .values_list(f"{source}_id", *(f"{target}__{key}" for key in nested))
+        )
+        grouped = defaultdict(list)
+        for project_id, *values in links:
+            grouped[project_id].append(dict(zip(nested, values)))
+        return grouped
+
+
+class ProjectSuggestionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ["id", "name", "slug"]
@@ -1,37 +1,236 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import cache
+from itertools import islice
+from email.utils import parsedate_to_datetime
+
 from requests_oauthlib import OAuth2Session
 import requests
+from requests.adapters import HTTPAdapter
 from decouple import config
+from django.db import connections
+from django.utils import timezone
+
+from .ratelimit import RateLimiter, TokenBucket
+from .tokens import DatabaseTokenStore
 
 
 class API42Client:
-    def __init__(self):
-        self.uid = config('API_42_UID')
-        self.secret = config('API_42_SECRET')
-        self.base_url = 'https://api.intra.42.fr'
+    # Statuses worth another attempt: rate limited or a transient server error
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self, base_url=None, uid=None, secret=None, rate_limiter=None, token_store=None
+    ):
+        self.uid = uid if uid is not None else config('API_42_UID')
+        self.secret = secret if secret is not None else config('API_42_SECRET')
+        self.base_url = base_url or config(
+            'API_42_BASE_URL', default='https://api.intra.42.fr'
+        )
         self.token_url = f'{self.base_url}/oauth/token'
         self.auth_url = f'{self.base_url}/oauth/authorize'
         self.access_token = None
+        self.token_expires_at = None
+
+        # Tokens are shared with every client of the same app through the store
+        # and replaced `token_refresh_margin` seconds before they expire
+        self.token_store = token_store or DatabaseTokenStore()
+        self.token_key = f'{self.base_url} {self.uid}'
+        self.token_refresh_margin = timedelta(
+            seconds=config('API_42_TOKEN_REFRESH_MARGIN', default=300, cast=float)
+        )
+        self.token_lock = threading.Lock()
+
+        # (connect, read) seconds
+        self.timeout = (
+            config('API_42_CONNECT_TIMEOUT', default=5, cast=float),
+            config('API_42_READ_TIMEOUT', default=30, cast=float),
+        )
+        self.max_retries = config('API_42_MAX_RETRIES', default=5, cast=int)
+        self.backoff_base = config('API_42_BACKOFF_BASE', default=0.5, cast=float)
+        self.backoff_max = config('API_42_BACKOFF_MAX', default=30, cast=float)
+        self.sleep = time.sleep
+
+        # One keep-alive connection pool for every call of this client
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_maxsize=config('API_42_POOL_SIZE', default=10, cast=int)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
-    def authenticate(self):
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(
+                TokenBucket(config('API_42_RATE_PER_SECOND', default=2, cast=int)),
+                TokenBucket(
+                    config('API_42_RATE_PER_HOUR', default=1200, cast=int), per=3600
+                ),
+            )
+        self.rate_limiter = rate_limiter
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+
+    def exchange_token(self):
         """Get access token using client credentials flow"""
         data = {
             'grant_type': 'client_credentials',
             'client_secret': self.secret,
             'client_id': self.uid,
         }
-        response = requests.post(self.token_url, data=data)
-        response.raise_for_status()
+        requested_at = timezone.now()
+        response = self.request('POST', self.token_url, data=data)
 
         token_data = response.json()
-        self.access_token = token_data['access_token']
+        expires_in = token_data.get('expires_in', 7200)
+        return token_data['access_token'], requested_at + timedelta(seconds=expires_in)
+
+    def token(self, rejected=None):
+        """A usable access token: this client's own, the shared one or a new
+        one, never `rejected`"""
+
+        def is_usable(token):
+            access_token, expires_at = token
+            return (
+                access_token != rejected
+                and expires_at - self.token_refresh_margin > timezone.now()
+            )
+
+        if self.access_token and is_usable((self.access_token, self.token_expires_at)):
+            return self.access_token
+        with self.token_lock:
+            token = self.token_store.get(self.token_key)
+            if token is None or not is_usable(token):
+                token = self.token_store.refresh(
+                    self.token_key, self.exchange_token, is_usable
+                )
+            self.access_token, self.token_expires_at = token
         return self.access_token
 
     def get(self, endpoint, params=None):
         """Make authenticated GET request to 42 API"""
-        if not self.access_token:
-            self.authenticate()
-        headers = {'Authorization': f'Bearer {self.access_token}'}
+        return self.get_response(endpoint, params).json()
+
+    def get_response(self, endpoint, params=None):
         url = f'{self.base_url}{endpoint}'
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        token = self.token()
+        try:
+            return self.request(
+                'GET', url, headers={'Authorization': f'Bearer {token}'}, params=params
+            )
+        except requests.HTTPError as error:
+            if error.response is None or error.response.status_code != 401:
+                raise
+        # Revoked or rotated before its expiry: replace it and try once more
+        token = self.token(rejected=token)
+        return self.request(
+            'GET', url, headers={'Authorization': f'Bearer {token}'}, params=params
+        )
+
+    def iter_pages(self, endpoint, params=None, per_page=100, concurrency=1):
+        """Yield every page of a paginated endpoint, in order.
+
+        The page count comes from the `X-Total` header of the first page; the
+        remaining pages are then fetched by `concurrency` threads sharing the
+        rate limiter, at most `2 * concurrency` pages ahead of the consumer.
+        Without the header, pages are read one by one until an empty one.
+        """
+        params = {**(params or {}), 'per_page': per_page}
+
+        def fetch(page):
+            return self.get(endpoint, {**params, 'page': page})
+
+        def fetch_in_thread(page):
+            try:
+                return fetch(page)
+            finally:
+                # A token refresh opens a connection in this worker thread.
+                connections.close_all()
+
+        response = self.get_response(endpoint, {**params, 'page': 1})
+        first = response.json()
+        if not first:
+            return
+        yield first
+
+        total = response.headers.get('X-Total')
+        if concurrency <= 1 or total is None:
+            page = 2
+            while True:
+                data = fetch(page)
+                if not data:
+                    return
+                yield data
+                page += 1
+
+        per_page = int(response.headers.get('X-Per-Page', per_page))
+        pages = iter(range(2, math.ceil(int(total) / per_page) + 1))
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        pending = deque()
+        try:
+            for page in islice(pages, 2 * concurrency):
+                pending.append(executor.submit(fetch_in_thread, page))
+            while pending:
+                data = pending.popleft().result()
+                page = next(pages, None)
+                if page is not None:
+                    pending.append(executor.submit(fetch_in_thread, page))
+                if data:
+                    yield data
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def request(self, method, url, **kwargs):
+        """Rate-limited request on the pooled session, retrying connection
+        errors, timeouts, 429 and 5xx responses"""
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            retries_left = attempt < self.max_retries
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if not retries_left:
+                    raise
+                self.sleep(self.backoff(attempt))
+                continue
+            if response.status_code in self.RETRY_STATUSES and retries_left:
+                delay = self.retry_after(response)
+                self.sleep(self.backoff(attempt) if delay is None else delay)
+                continue
+            response.raise_for_status()
+            return response
+
+    def backoff(self, attempt):
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def retry_after(self, response):
+        """Seconds asked for by a `Retry-After` header, if any"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+
+@cache
+def shared_client():
+    """The API client of this process, for callers that come and go (such
+    as background imports), so they share its rate limits, token and
+    connection pool instead of each starting with a full burst. It lives as
+    long as the process."""
+    return API42Client()
@@ -0,0 +1,85 @@
+import gzip
+import json
+import threading
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class PageArchive:
+    """Append-only gzip JSON Lines archive of raw API pages.
+
+    Every opening adds a new gzip member, so the file stays readable as a
+    single stream. Pages can be archived from several threads at once; each
+    record is written whole.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.file = gzip.open(self.path, "at", encoding="utf-8")
+        self.fetched_at = timezone.now().isoformat()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+    def pages(self, pages, **metadata):
+        """Pass `pages` through, archiving each one tagged with `metadata`"""
+        for number, projects in enumerate(pages, start=1):
+            record = {
+                **metadata,
+                "fetched_at": self.fetched_at,
+                "page": number,
+                "projects": projects,
+            }
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+            with self.lock:
+                self.file.write(line)
+                self.file.flush()
+            yield projects
+
+
+def replay_pages(path, **metadata):
+    """Yield the archived pages whose metadata matches `metadata`.
+
+    Runs are appended oldest first, so a project can be archived several
+    times: only its newest version is replayed, the one with the latest
+    upstream `updated_at` or, on ties, the last archived. This reads the
+    archive twice instead of holding it in memory.
+    """
+    newest = {}
+    for position, data in enumerate(_archived_projects(path, metadata)):
+        updated_at = parse_datetime(data.get("updated_at") or "")
+        # Versions without `updated_at` sort first and only compare positions.
+        version = (updated_at is not None, updated_at, position)
+        newest[data["id"]] = max(newest.get(data["id"], version), version)
+
+    position = 0
+    for projects in _archived_pages(path, metadata):
+        page = []
+        for data in projects:
+            if newest[data["id"]][2] == position:
+                page.append(data)
+            position += 1
+        if page:
+            yield page
+
+
+def _archived_pages(path, metadata):
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        try:
+            for line in archive:
+                record = json.loads(line)
+                if all(record.get(key) == value for key, value in metadata.items()):
+                    yield record["projects"]
+        except EOFError:
+            # The last run was interrupted mid-write; keep what is complete.
+            return
+
+
+def _archived_projects(path, metadata):
+    for projects in _archived_pages(path, metadata):
+        yield from projects
@@ -0,0 +1,33 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from decouple import config
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def run_in_background(function, *args):
+    """Run `function(*args)` on the shared background thread pool, so the
+    request that triggers it does not wait. Returns the future; failures are
+    logged."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=config("BACKGROUND_WORKERS", default=2, cast=int),
+            thread_name_prefix="background",
+        )
+    return _executor.submit(_run, function, *args)
+
+
+def _run(function, *args):
+    # Threads outside the request cycle manage their own connections.
+    close_old_connections()
+    try:
+        return function(*args)
+    except Exception:
+        logger.exception("Background task %s%r failed", function.__name__, args)
+    finally:
+        connections.close_all()
@@ -0,0 +1,223 @@
+import queue
+import threading
+import time
+
+from django.db import connections
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class StageStats:
+    """Work done by one pipeline stage and the depth of its output buffer"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.records = 0
+        self.busy = 0.0
+        self.depth_max = 0
+        self.depth_total = 0
+        self.depth_samples = 0
+
+    def add(self, item, seconds):
+        self.items += 1
+        self.records += len(item) if hasattr(item, "__len__") else 1
+        self.busy += seconds
+
+    def sample_depth(self, depth):
+        self.depth_max = max(self.depth_max, depth)
+        self.depth_total += depth
+        self.depth_samples += 1
+
+    @property
+    def throughput(self):
+        """Records per busy second"""
+        return self.records / self.busy if self.busy else 0.0
+
+    @property
+    def depth_mean(self):
+        return self.depth_total / self.depth_samples if self.depth_samples else 0.0
+
+    def __str__(self):
+        line = (
+            f"{self.name:<10} {self.items:>5} items {self.records:>7} records "
+            f"{self.busy:8.2f}s busy {self.throughput:10,.0f} records/s"
+        )
+        if self.depth_samples:
+            line += f"   queue max {self.depth_max} avg {self.depth_mean:.1f}"
+        return line
+
+
+class Pipeline:
+    """Streaming pipeline: `source` and each `(name, function)` stage run in
+    a thread of their own, connected by queues of at most `buffer` items, so
+    fetching overlaps with processing.
+
+    Iterating yields the output of the last stage on the calling thread,
+    which acts as the final `sink_name` stage (database connections and
+    transactions stay on that thread). Errors in any stage are re-raised
+    there; leaving the loop early stops every thread.
+    """
+
+    def __init__(self, source, stages, buffer=4, sink_name="sink"):
+        self.source = source
+        self.stages = stages
+        self.buffer = buffer
+        names = ["fetch", *(name for name, _ in stages), sink_name]
+        self.stats = [StageStats(name) for name in names]
+        self.stopping = threading.Event()
+
+    def __iter__(self):
+        queues = [queue.Queue(self.buffer) for _ in range(len(self.stages) + 1)]
+        threads = [
+            threading.Thread(
+                target=self._produce, args=(queues[0], self.stats[0]), daemon=True
+            )
+        ]
+        for index, (_, function) in enumerate(self.stages):
+            threads.append(
+                threading.Thread(
+                    target=self._process,
+                    args=(function, *queues[index : index + 2], self.stats[index + 1]),
+                    daemon=True,
+                )
+            )
+        for thread in threads:
+            thread.start()
+
+        sink = self.stats[-1]
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failed):
+                    raise item.error
+                started = time.perf_counter()
+                yield item
+                sink.add(item, time.perf_counter() - started)
+        finally:
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+
+    def _put(self, output, item, stats=None):
+        while not self.stopping.is_set():
+            try:
+                output.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            if stats is not None:
+                stats.sample_depth(output.qsize())
+            return True
+        return False
+
+    def _produce(self, output, stats):
+        source = iter(self.source)
+        try:
+            while not self.stopping.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(source)
+                except StopIteration:
+                    break
+                stats.add(item, time.perf_counter() - started)
+                if not self._put(output, item, stats):
+                    return
+            self._put(output, _DONE)
+        except Exception as error:
+            self._put(output, _Failed(error))
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+            # Sources may query the database (the token store does); close
+            # what this thread opened, nothing else will.
+            connections.close_all()
+
+    def _process(self, function, inbox, output, stats):
+        try:
+            self._process_items(function, inbox, output, stats)
+        finally:
+            connections.close_all()
+
+    def _process_items(self, function, inbox, output, stats):
+        while True:
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                if self.stopping.is_set():
+                    return
+                continue
+            if item is _DONE or isinstance(item, _Failed):
+                self._put(output, item)
+                return
+            started = time.perf_counter()
+            try:
+                result = function(item)
+            except Exception as error:
+                self._put(output, _Failed(error))
+                return
+            stats.add(result, time.perf_counter() - started)
+            if not self._put(output, result, stats):
+                return
+
+
+def merge(sources, buffer=4):
+    """Yield the items of every iterable of `sources` as they come, each one
+    read by a thread of its own.
+
+    Errors in a source are re-raised here; closing the generator stops and
+    closes every source.
+    """
+    output = queue.Queue(buffer)
+    stopping = threading.Event()
+
+    def put(item):
+        while not stopping.is_set():
+            try:
+                output.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def read(source):
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as error:
+            put(_Failed(error))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=read, args=(source,), daemon=True) for source in sources
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        running = len(threads)
+        while running:
+            item = output.get()
+            if item is _DONE:
+                running -= 1
+            elif isinstance(item, _Failed):
+                raise item.error
+            else:
+                yield item
+    finally:
+        stopping.set()
+        for thread in threads:
+            thread.join()
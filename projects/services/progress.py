@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from projects.models import UserProjectStatus
+
+from .api_client import shared_client
+from .background import run_in_background
+
+
+def import_progress(user, client=None):
+    """Replace the stored progress of `user` with their 42 `projects_users`.
+
+    Every page is read before writing, then the rows are upserted in one
+    statement and the projects the user no longer has are dropped. Uses the
+    process-wide `shared_client()` unless given a `client`. Returns the
+    number of projects imported.
+    """
+    client = client or shared_client()
+    statuses = {}
+    for page in client.iter_pages(f"/v2/users/{user.user_42_id}/projects_users"):
+        for data in page:
+            project_id = (data.get("project") or {}).get("id")
+            if project_id is None:
+                continue
+            status_42 = data.get("status") or ""
+            statuses[project_id] = UserProjectStatus(
+                user_id=user.pk,
+                project_id=project_id,
+                status=(
+                    UserProjectStatus.FINISHED
+                    if status_42 == "finished"
+                    else UserProjectStatus.IN_PROGRESS
+                ),
+                status_42=status_42,
+                final_mark=data.get("final_mark"),
+                validated=data.get("validated?"),
+                marked_at=parse_datetime(data.get("marked_at") or ""),
+            )
+
+    with transaction.atomic():
+        UserProjectStatus.objects.bulk_create(
+            statuses.values(),
+            update_conflicts=True,
+            unique_fields=["user", "project_id"],
+            update_fields=[
+                "status",
+                "status_42",
+                "final_mark",
+                "validated",
+                "marked_at",
+                "imported_at",
+            ],
+        )
+        UserProjectStatus.objects.filter(user_id=user.pk).exclude(
+            project_id__in=statuses
+        ).delete()
+    return len(statuses)
+
+
+def schedule_progress_import(user):
+    """Import the progress of `user` in the background. Returns the future,
+    or None for users without a 42 account."""
+    if user.user_42_id is None:
+        return None
+    return run_in_background(import_progress, user)
@@ -0,0 +1,46 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per `per` seconds,
+    with bursts of up to `capacity` (defaults to `rate`)"""
+
+    def __init__(self, rate, per=1.0, capacity=None, clock=time.monotonic):
+        self.fill_rate = rate / per
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.fill_rate
+        )
+        self.updated = now
+
+    def reserve(self):
+        """Take a token and return how long to wait before using it"""
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.fill_rate
+
+
+class RateLimiter:
+    """Several token buckets that must all allow a request, e.g. the 42 API's
+    per-second and per-hour application limits"""
+
+    def __init__(self, *buckets, sleep=time.sleep):
+        self.buckets = buckets
+        self.sleep = sleep
+
+    def acquire(self):
+        delay = max((bucket.reserve() for bucket in self.buckets), default=0.0)
+        if delay > 0:
+            self.sleep(delay)
+        return delay
@@ -0,0 +1,108 @@
+import re
+
+from projects.models import ClassificationRule
+
+
+class RuleSet:
+    """Classification rules compiled into one regular expression per kind.
+
+    Skip keywords match anywhere in the name or slug, ignoring case; slug
+    fragments for specializations and languages match case-sensitively. A
+    lookup is one regex scan whatever the number of rules (plus one per extra
+    match), and returns the rules that fired.
+    """
+
+    def __init__(self, rules):
+        rules = [rule for rule in rules if rule.enabled]
+        by_kind = {}
+        for rule in rules:
+            by_kind.setdefault(rule.kind, []).append(rule)
+
+        self.skip_rules = {
+            rule.pattern.lower(): rule
+            for rule in by_kind.get(ClassificationRule.SKIP_KEYWORD, [])
+        }
+        self.skip_regex = self._compile(self.skip_rules)
+
+        self.tag_rules = {}
+        self.tag_regexes = {}
+        self.tag_fragments = {}
+        for relation, kind in [
+            ("specializations", ClassificationRule.SPECIALIZATION),
+            ("languages", ClassificationRule.LANGUAGE),
+        ]:
+            fragments = {}
+            for rule in by_kind.get(kind, []):
+                fragments.setdefault(rule.pattern, []).append(rule)
+            self.tag_rules[relation] = fragments
+            self.tag_regexes[relation] = self._compile(fragments)
+            # Fragments by first character, to find every fragment starting
+            # where the regex matched, not only the longest one.
+            by_first = {}
+            for fragment in sorted(fragments, key=len, reverse=True):
+                by_first.setdefault(fragment[:1], []).append(fragment)
+            self.tag_fragments[relation] = by_first
+
+        campus_rules = by_kind.get(ClassificationRule.MIN_CAMPUSES, [])
+        self.min_campuses_rule = max(
+            campus_rules, key=lambda rule: int(rule.pattern), default=None
+        )
+        self.min_campuses = (
+            int(self.min_campuses_rule.pattern) if self.min_campuses_rule else 0
+        )
+        self.excluded_campuses = {
+            int(rule.pattern)
+            for rule in by_kind.get(ClassificationRule.EXCLUDED_CAMPUS, [])
+        }
+
+    @classmethod
+    def load(cls):
+        return cls(ClassificationRule.objects.filter(enabled=True))
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        # Longest first, so the most specific pattern wins at any position.
+        alternatives = sorted(patterns, key=len, reverse=True)
+        return re.compile("|".join(map(re.escape, alternatives)))
+
+    def skip_rule(self, name, slug):
+        """The skip keyword rule matching `name` or `slug`, if any"""
+        if self.skip_regex is None:
+            return None
+        # Lower-casing once beats an IGNORECASE scan; keywords hold no newline.
+        match = self.skip_regex.search(f"{name}\n{slug}".lower())
+        return self.skip_rules[match.group(0)] if match else None
+
+    def tag_rules_for(self, relation, slug):
+        """Rules of `relation` whose fragment occurs in `slug`"""
+        regex = self.tag_regexes[relation]
+        if regex is None:
+            return []
+        fired = []
+        match = regex.search(slug)
+        while match:
+            start = match.start()
+            # The regex only reports the longest fragment at this position;
+            # shorter ones starting here (`cpp` in `cpp-module`) fire too.
+            for fragment in self.tag_fragments[relation][slug[start]]:
+                if slug.startswith(fragment, start):
+                    for rule in self.tag_rules[relation][fragment]:
+                        if rule not in fired:
+                            fired.append(rule)
+            # Search again from the next position to catch overlapping ones.
+            match = regex.search(slug, start + 1)
+        return fired
+
+    def tags(self, slug):
+        """{relation: tag names} for every relation with a matching rule"""
+        tags = {}
+        for relation in self.tag_rules:
+            targets = [rule.target for rule in self.tag_rules_for(relation, slug)]
+            if targets:
+                tags[relation] = list(dict.fromkeys(targets))
+        return tags
+
+    def has_excluded_campus(self, campus_ids):
+        return not self.excluded_campuses.isdisjoint(campus_ids)
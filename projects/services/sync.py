@@ -0,0 +1,174 @@
+import hashlib
+import json
+
+from projects.models import Cursus, Language, Project, Specialization
+
+
+def content_hash(fields, tags):
+    """Stable digest of a project row, independent of key and tag order"""
+    normalized = {
+        "fields": fields,
+        "tags": {name: sorted(set(names)) for name, names in tags.items()},
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ProjectWriter:
+    """Batched persistence of projects fetched from the 42 API.
+
+    Each batch is one lookup of the rows that already exist (so the counts
+    stay exact), one upsert on `project_id` and a couple of bulk statements
+    per relation, whatever the batch size. Rows whose content hash did not
+    change are skipped, so their `updated_at` stays put. Tag lookups are
+    loaded once per writer. Run it inside a transaction.
+    """
+
+    relations = {"languages": Language, "specializations": Specialization}
+
+    def __init__(self):
+        self.tags = {
+            name: {tag.name: tag.pk for tag in model.objects.all()}
+            for name, model in self.relations.items()
+        }
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    @property
+    def processed(self):
+        return self.created + self.updated + self.unchanged
+
+    def write(self, rows):
+        """Upsert `rows` of `(fields, tags)`.
+
+        `fields` are Project field values including `project_id`; `tags` maps
+        a relation name to the tag names the project should have, and
+        relations missing from it are left untouched. Returns the pks of the
+        projects actually written.
+        """
+        # ON CONFLICT cannot touch the same row twice in one statement.
+        batch = {fields["project_id"]: (fields, tags) for fields, tags in rows}
+        if not batch:
+            return []
+
+        existing = dict(
+            Project.objects.filter(project_id__in=batch).values_list(
+                "project_id", "content_hash"
+            )
+        )
+        changed = {}
+        for project_id, (fields, tags) in batch.items():
+            digest = content_hash(fields, tags)
+            if existing.get(project_id) != digest:
+                changed[project_id] = ({**fields, "content_hash": digest}, tags)
+        self.unchanged += len(batch) - len(changed)
+        if not changed:
+            return []
+
+        update_fields = [
+            name
+            for name in next(iter(changed.values()))[0]
+            if name not in ("project_id", "created_at")
+        ]
+        projects = Project.objects.bulk_create(
+            [Project(**fields) for fields, _ in changed.values()],
+            update_conflicts=True,
+            unique_fields=["project_id"],
+            update_fields=[*update_fields, "updated_at"],
+        )
+        pks = [project.pk for project in projects]
+
+        for name in self.relations:
+            self.write_relation(
+                name,
+                {
+                    project.pk: tags[name]
+                    for project, (_, tags) in zip(projects, changed.values())
+                    if name in tags
+                },
+            )
+        Project.objects.filter(pk__in=pks).update_search_vector()
+
+        updated = len(changed.keys() & existing.keys())
+        self.created += len(changed) - updated
+        self.updated += updated
+        return pks
+
+    def write_relation(self, name, wanted):
+        """Replace the `name` tags of the projects in `wanted` ({pk: tag
+        names}) with bulk statements on the through table"""
+        if not wanted:
+            return
+        through = getattr(Project, name).through
+        tag_column = f"{getattr(Project, name).field.m2m_reverse_field_name()}_id"
+        tag_ids = self.tags[name]
+        links = {
+            (pk, tag_ids[tag])
+            for pk, tags in wanted.items()
+            for tag in tags
+            if tag in tag_ids
+        }
+        current = {
+            (pk, tag_pk): link_pk
+            for link_pk, pk, tag_pk in through.objects.filter(
+                project_id__in=wanted
+            ).values_list("pk", "project_id", tag_column)
+        }
+        stale = [link_pk for link, link_pk in current.items() if link not in links]
+        if stale:
+            through.objects.filter(pk__in=stale).delete()
+        through.objects.bulk_create(
+            [
+                through(project_id=pk, **{tag_column: tag_pk})
+                for pk, tag_pk in links - current.keys()
+            ]
+        )
+
+    def write_cursus(self, memberships, replace=()):
+        """Link projects to their cursus, from `memberships` ({project_id:
+        cursus ids}). Links of the cursus in `replace` to projects missing
+        from `memberships` are removed; other links are only ever added.
+
+        Returns the numbers of links added and removed.
+        """
+        cursus_ids = {cursus_id for ids in memberships.values() for cursus_id in ids}
+        cursus = dict(
+            Cursus.objects.filter(cursus_id__in=cursus_ids | set(replace)).values_list(
+                "cursus_id", "pk"
+            )
+        )
+        pks = dict(
+            Project.objects.filter(project_id__in=memberships).values_list(
+                "project_id", "pk"
+            )
+        )
+        links = {
+            (pks[project_id], cursus[cursus_id])
+            for project_id, ids in memberships.items()
+            if project_id in pks
+            for cursus_id in ids
+            if cursus_id in cursus
+        }
+        through = Project.cursus.through
+        current = {
+            (project_pk, cursus_pk): link_pk
+            for link_pk, project_pk, cursus_pk in through.objects.filter(
+                cursus_id__in=cursus.values()
+            ).values_list("pk", "project_id", "cursus_id")
+        }
+        replaced = {cursus[cursus_id] for cursus_id in replace if cursus_id in cursus}
+        stale = [
+            link_pk
+            for link, link_pk in current.items()
+            if link not in links and link[1] in replaced
+        ]
+        if stale:
+            through.objects.filter(pk__in=stale).delete()
+        added = through.objects.bulk_create(
+            [
+                through(project_id=project_pk, cursus_id=cursus_pk)
+                for project_pk, cursus_pk in links - current.keys()
+            ]
+        )
+        return len(added), len(stale)
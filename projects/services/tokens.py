@@ -0,0 +1,31 @@
+from django.db import transaction
+
+from projects.models import ApiToken
+
+
+class DatabaseTokenStore:
+    """Tokens shared by every process through the ApiToken table.
+
+    Tokens are `(access_token, expires_at)` pairs. A refresh locks the row, so
+    workers that need a new token at the same time wait for a single exchange
+    and then reuse its result.
+    """
+
+    def get(self, key):
+        return (
+            ApiToken.objects.filter(key=key, expires_at__isnull=False)
+            .exclude(access_token="")
+            .values_list("access_token", "expires_at")
+            .first()
+        )
+
+    def refresh(self, key, fetch, is_usable):
+        with transaction.atomic():
+            ApiToken.objects.get_or_create(key=key)
+            row = ApiToken.objects.select_for_update().get(key=key)
+            token = (row.access_token, row.expires_at)
+            if row.access_token and row.expires_at and is_usable(token):
+                return token
+            row.access_token, row.expires_at = token = fetch()
+            row.save(update_fields=["access_token", "expires_at"])
+            return token
@@ -0,0 +1,57 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .cache import bump_catalog_version_on_commit
+from .models import Language, Project, ProjectTombstone, Specialization
+
+# Sent after writes that bypass model signals (bulk_create, update(), ...).
+catalog_changed = Signal()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Language)
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Language)
+@receiver(post_delete, sender=Specialization)
+@receiver(m2m_changed, sender=Project.languages.through)
+@receiver(m2m_changed, sender=Project.specializations.through)
+@receiver(catalog_changed)
+def invalidate_catalog_cache(sender, **kwargs):
+    if kwargs.get("action", "post_").startswith("post_"):
+        bump_catalog_version_on_commit()
+
+
+def touch_projects(projects):
+    """Bump `updated_at` so HTTP validators see changes to related rows"""
+    projects.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Project.languages.through)
+@receiver(m2m_changed, sender=Project.specializations.through)
+def touch_retagged_projects(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith("post_"):
+            touch_projects(Project.objects.filter(pk=instance.pk))
+    elif action in ("post_add", "post_remove"):
+        touch_projects(Project.objects.filter(pk__in=pk_set))
+    elif action == "pre_clear":
+        touch_projects(instance.project_set.all())
+
+
+@receiver(post_save, sender=Language)
+@receiver(post_save, sender=Specialization)
+@receiver(pre_delete, sender=Language)
+@receiver(pre_delete, sender=Specialization)
+def touch_projects_of_tag(sender, instance, **kwargs):
+    touch_projects(instance.project_set.all())
+
+
+@receiver(post_delete, sender=Project)
+def record_tombstone(sender, instance, **kwargs):
+    """Remember deletions for the change feed"""
+    ProjectTombstone.objects.update_or_create(
+        project_pk=instance.pk,
+        defaults={"project_id": instance.project_id, "deleted_at": timezone.now()},
+    )
@@ -1,3 +1,1681 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
 
-# Create your tests here.
+import requests
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from .admin import ProjectAdmin
+from .benchmarking.synthetic import build_catalog, ensure_tags
+from .cache import cache_stats, catalog_version, get_cache
+from .models import (
+    ApiToken,
+    ClassificationRule,
+    Cursus,
+    Language,
+    Project,
+    Specialization,
+    SyncState,
+    UserProjectStatus,
+)
+from .serializers import ProjectSerializer
+from .services.api_client import API42Client, shared_client
+from .services.background import run_in_background
+from .services.pipeline import Pipeline, merge
+from .services.progress import import_progress
+from .services.ratelimit import RateLimiter, TokenBucket
+from .services.rules import RuleSet
+from .services.sync import ProjectWriter
+from .services.tagging import toggle_tag
+from .views import ProjectViewSet
+
+
+class CatalogTestCase(TestCase):
+    """Start every test with an empty response cache: the database is rolled
+    back between tests but the cache is not."""
+
+    def setUp(self):
+        get_cache().clear()
+
+
+class ProjectQueryBudgetTests(CatalogTestCase):
+    """The project endpoints must cost a fixed number of queries whatever
+    the catalog size: the conditional GET validator, one for projects and
+    one per nested relation."""
+
+    LIST_QUERY_BUDGET = 4
+    DETAIL_QUERY_BUDGET = 4
+
+    def assertWithinBudget(self, size):
+        projects = build_catalog(size)
+
+        with self.assertNumQueries(self.LIST_QUERY_BUDGET):
+            response = self.client.get("/api/projects/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), size)
+
+        with self.assertNumQueries(self.DETAIL_QUERY_BUDGET):
+            response = self.client.get(f"/api/projects/{projects[0].pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["languages"]), 1)
+
+    def test_10_projects(self):
+        self.assertWithinBudget(10)
+
+    def test_1000_projects(self):
+        self.assertWithinBudget(1_000)
+
+    def test_50000_projects(self):
+        self.assertWithinBudget(50_000)
+
+
+class ProjectSearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        build_catalog(5)
+        Project.objects.filter(slug="libft-0").update(
+            name="Minishell Companion", description="A tiny shell helper"
+        )
+        Project.objects.filter(slug="get_next_line-1").update(
+            description="Write a minishell compatible reader"
+        )
+        Project.objects.update_search_vector()
+
+    def test_name_match_ranks_above_description_match(self):
+        response = self.client.get("/api/projects/", {"search": "minishell"})
+        slugs = [project["slug"] for project in response.json()]
+        self.assertEqual(slugs, ["libft-0", "get_next_line-1"])
+
+    def test_partial_word_matches_prefix(self):
+        response = self.client.get("/api/projects/", {"search": "minish"})
+        self.assertEqual(len(response.json()), 2)
+
+    def test_explicit_ordering_overrides_rank(self):
+        response = self.client.get(
+            "/api/projects/", {"search": "minishell", "ordering": "-name"}
+        )
+        names = [project["name"] for project in response.json()]
+        self.assertEqual(names, sorted(names, reverse=True))
+
+    def test_stopwords_only_search_falls_back_to_substrings(self):
+        Project.objects.filter(slug="minitalk-4").update(description="Over the wire")
+        response = self.client.get("/api/projects/", {"search": "the"})
+        slugs = {project["slug"] for project in response.json()}
+        self.assertIn("minitalk-4", slugs)
+        self.assertEqual(
+            slugs,
+            set(
+                Project.objects.filter(
+                    Q(name__icontains="the") | Q(description__icontains="the")
+                ).values_list("slug", flat=True)
+            ),
+        )
+
+
+class ProjectSuggestTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for project_id, (name, slug) in enumerate(
+            [
+                ("Philosophers", "42cursus-philosophers"),
+                ("cub3d", "cub3d"),
+                ("ft_irc", "ft_irc"),
+                ("minishell", "42cursus-minishell"),
+                ("Libft", "42cursus-libft"),
+            ]
+        ):
+            Project.objects.create(
+                project_id=project_id, name=name, slug=slug, solo=True
+            )
+
+    def suggest(self, query):
+        response = self.client.get("/api/projects/suggest/", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_misspelled_query_matches(self):
+        self.assertEqual(self.suggest("philosofers")[0]["name"], "Philosophers")
+
+    def test_partial_query_matches(self):
+        self.assertEqual(self.suggest("cub3")[0]["slug"], "cub3d")
+        self.assertEqual(self.suggest("ft_irc")[0]["slug"], "ft_irc")
+
+    def test_returns_only_dropdown_fields_in_one_query(self):
+        with self.assertNumQueries(1):
+            suggestions = self.suggest("minishel")
+        self.assertEqual(set(suggestions[0]), {"id", "name", "slug"})
+
+    def test_empty_query_returns_nothing(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest(""), [])
+
+    def test_limit_is_capped(self):
+        for project_id in range(100, 125):
+            Project.objects.create(
+                project_id=project_id,
+                name=f"Rush {project_id}",
+                slug=f"42cursus-rush-{project_id}",
+                solo=True,
+            )
+        response = self.client.get(
+            "/api/projects/suggest/", {"q": "42cursus", "limit": 1}
+        )
+        self.assertEqual(len(response.json()), 1)
+        response = self.client.get(
+            "/api/projects/suggest/", {"q": "42cursus", "limit": 100}
+        )
+        self.assertEqual(len(response.json()), 20)
+
+
+class ProjectKeysetPaginationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        build_catalog(45)
+
+    def walk(self, ordering, page_size=10):
+        """Follow `next` links to the end; return ids and the last response"""
+        ids = []
+        url = "/api/projects/"
+        params = {"ordering": ordering, "page_size": page_size}
+        while url:
+            response = self.client.get(url, params).json()
+            self.assertEqual(response["count"], 45)
+            ids += [project["id"] for project in response["results"]]
+            url, params = response["next"], None
+        return ids, response
+
+    def test_every_ordering_field_covers_catalog_exactly_once(self):
+        for field in ["name", "xp_points", "estimate_time"]:
+            for ordering in [field, f"-{field}"]:
+                with self.subTest(ordering=ordering):
+                    ids, _ = self.walk(ordering)
+                    tiebreak = "-id" if ordering.startswith("-") else "id"
+                    expected = list(
+                        Project.objects.order_by(ordering, tiebreak).values_list(
+                            "id", flat=True
+                        )
+                    )
+                    self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_to_earlier_page(self):
+        first = self.client.get(
+            "/api/projects/", {"ordering": "-xp_points", "page_size": 10}
+        ).json()
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual(back["results"], first["results"])
+
+    def test_deep_pages_cost_the_same_as_page_one(self):
+        # validator + count + page + one query per nested relation
+        with self.assertNumQueries(5):
+            page = self.client.get(
+                "/api/projects/", {"ordering": "estimate_time", "page_size": 5}
+            ).json()
+        for _ in range(6):
+            page = self.client.get(page["next"]).json()
+        with self.assertNumQueries(5):
+            self.client.get(page["next"])
+
+    def test_unpaginated_clients_get_a_plain_list(self):
+        response = self.client.get("/api/projects/")
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 45)
+
+    def test_cursor_for_another_ordering_is_rejected(self):
+        page = self.client.get("/api/projects/", {"page_size": 10}).json()
+        cursor = page["next"].split("cursor=")[1]
+        response = self.client.get(
+            "/api/projects/", {"cursor": cursor, "ordering": "xp_points"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_is_rejected(self):
+        valid = {"o": "xp_points", "v": 100, "id": 1, "r": False}
+        tampered = [
+            {key: value for key, value in valid.items() if key != "r"},
+            {**valid, "r": 1},
+            {**valid, "id": True},
+            {**valid, "v": {}},
+            {**valid, "v": "abc"},
+            ["xp_points", 100, 1, False],
+        ]
+        for payload in tampered:
+            with self.subTest(payload=payload):
+                cursor = base64.urlsafe_b64encode(json.dumps(payload).encode())
+                response = self.client.get(
+                    "/api/projects/",
+                    {"cursor": cursor.decode(), "ordering": "xp_points"},
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+class ProjectSparseFieldsetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = build_catalog(3)[0]
+
+    def test_list_is_compact_and_detail_is_full(self):
+        listed = self.client.get("/api/projects/").json()[0]
+        self.assertNotIn("description", listed)
+        self.assertNotIn("objectives", listed)
+        self.assertIn("languages", listed)
+
+        detail = self.client.get(f"/api/projects/{self.project.pk}/").json()
+        self.assertEqual(list(detail), ProjectSerializer.Meta.fields)
+
+    def test_fields_loads_only_requested_columns(self):
+        with self.assertNumQueries(2) as captured:
+            response = self.client.get("/api/projects/", {"fields": "name,slug"})
+        self.assertEqual(set(response.json()[0]), {"name", "slug"})
+        sql = captured.captured_queries[-1]["sql"]
+        self.assertNotIn("description", sql)
+        self.assertNotIn("objectives", sql)
+
+    def test_fields_can_ask_for_detail_columns_on_list(self):
+        response = self.client.get("/api/projects/", {"fields": "id,description"})
+        self.assertEqual(set(response.json()[0]), {"id", "description"})
+
+    def test_omit_skips_relation_prefetch(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/projects/", {"omit": "languages"})
+        self.assertNotIn("languages", response.json()[0])
+        self.assertIn("specializations", response.json()[0])
+
+
+class FastSerializationConformanceTests(CatalogTestCase):
+    """The values()-based fast path must render byte-identical JSON to the
+    ProjectSerializer path."""
+
+    def setUp(self):
+        super().setUp()
+        projects = build_catalog(30)
+        python = Language.objects.get(name="python")
+        for project in projects[::3]:
+            project.languages.add(python)
+        projects[1].languages.clear()
+        projects[1].specializations.clear()
+        Project.objects.filter(pk=projects[2].pk).update(
+            name="Ünïcödé — “quoted”",
+            description=None,
+            objectives=["résumé", {"nested": [1, 2.5, None]}],
+            subject_download_url="https://cdn.intra.42.fr/pdf/pdf/1/en.subject.pdf",
+        )
+        self.project = projects[2]
+        self.factory = APIRequestFactory()
+
+    def render(self, action, fast, path="/api/projects/", params=None, **kwargs):
+        get_cache().clear()
+        view = ProjectViewSet.as_view({"get": action}, fast_serialization=fast)
+        response = view(self.factory.get(path, params or {}), **kwargs)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def assertConforms(self, action, **kwargs):
+        self.assertEqual(
+            self.render(action, fast=True, **kwargs),
+            self.render(action, fast=False, **kwargs),
+        )
+
+    def test_list(self):
+        self.assertConforms("list")
+
+    def test_list_with_every_field(self):
+        fields = ",".join(ProjectSerializer.Meta.fields)
+        self.assertConforms("list", params={"fields": fields})
+
+    def test_paginated_list(self):
+        self.assertConforms("list", params={"page_size": 7, "ordering": "-xp_points"})
+
+    def test_detail(self):
+        self.assertConforms(
+            "retrieve", path=f"/api/projects/{self.project.pk}/", pk=self.project.pk
+        )
+
+
+class ProjectFacetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        build_catalog(60)
+
+    def test_counts_match_the_catalog(self):
+        with self.assertNumQueries(3):
+            facets = self.client.get("/api/projects/facets/").json()
+        self.assertEqual(facets["count"], 60)
+        self.assertEqual(sum(facets["languages"].values()), 60)
+        self.assertEqual(sum(facets["specializations"].values()), 60)
+        self.assertEqual(
+            facets["solo"]["true"], Project.objects.filter(solo=True).count()
+        )
+        self.assertEqual(sum(facets["difficulty"].values()), 60)
+        self.assertEqual(
+            facets["languages"]["c"],
+            Project.objects.filter(languages__name="c").count(),
+        )
+
+    def test_counts_follow_filters(self):
+        python = Language.objects.get(name="python")
+        facets = self.client.get(
+            "/api/projects/facets/", {"languages": python.pk, "solo": "true"}
+        ).json()
+        expected = Project.objects.filter(languages=python, solo=True)
+        self.assertEqual(facets["count"], expected.count())
+        self.assertEqual(facets["languages"]["python"], expected.count())
+        self.assertEqual(facets["solo"]["false"], 0)
+
+    def test_results_are_cached_per_filter_combination(self):
+        self.client.get("/api/projects/facets/", {"solo": "true", "ordering": "name"})
+        with self.assertNumQueries(0):
+            self.client.get("/api/projects/facets/", {"solo": "true"})
+        with self.assertNumQueries(3):
+            self.client.get("/api/projects/facets/", {"solo": "false"})
+
+
+class ProjectResponseCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.projects = build_catalog(5)
+
+    def get(self, path="/api/projects/", params=None):
+        return self.client.get(path, params or {})
+
+    def test_repeated_requests_are_served_from_cache(self):
+        self.get(params={"solo": "true", "ordering": "name"})
+        # Only the conditional GET validator query is left.
+        with self.assertNumQueries(1):
+            response = self.get(params={"ordering": "name", "solo": "true"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cache_stats()["response"], {"hits": 1, "misses": 1})
+
+    def test_writes_invalidate_cached_responses(self):
+        project = self.projects[0]
+        detail = f"/api/projects/{project.pk}/"
+        python = Language.objects.get(name="python")
+        both = ["/api/projects/", detail]
+        writes = [
+            (lambda: Project.objects.filter(pk=project.pk).first().save(), both),
+            (lambda: project.languages.add(python), both),
+            (lambda: python.save(), both),
+            (lambda: project.specializations.clear(), both),
+            (
+                lambda: toggle_tag(
+                    Project.objects.filter(pk=project.pk), "languages", python
+                ),
+                both,
+            ),
+            (lambda: self.projects[-1].delete(), ["/api/projects/"]),
+        ]
+        for write, paths in writes:
+            for path in paths:
+                self.get(path)
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            for path in paths:
+                # validator + projects + one query per relation
+                with self.assertNumQueries(4):
+                    self.get(path)
+
+    def test_writes_without_a_version_bump_are_not_served_stale(self):
+        # Like a write made by another process with its own cache.
+        project = self.projects[0]
+        for path in ["/api/projects/", f"/api/projects/{project.pk}/"]:
+            self.get(path)
+            Project.objects.filter(pk=project.pk).update(
+                name=f"renamed-{path}", updated_at=timezone.now()
+            )
+            response = self.get(path)
+            self.assertIn(f"renamed-{path}", response.content.decode())
+            revalidated = self.client.get(path, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(revalidated.status_code, 304)
+
+    def test_missing_objects_are_not_cached(self):
+        self.get("/api/projects/0/")
+        self.assertEqual(self.get("/api/projects/0/").status_code, 404)
+        self.assertEqual(cache_stats()["response"]["hits"], 0)
+
+    def test_metrics_endpoint_exposes_counters_to_staff(self):
+        self.get()
+        self.get()
+        self.assertEqual(self.client.get("/api/metrics/cache/").status_code, 302)
+        staff = get_user_model().objects.create_user("staff", is_staff=True)
+        self.client.force_login(staff)
+        body = self.client.get("/api/metrics/cache/").content.decode()
+        self.assertIn(
+            'projects_cache_requests_total{cache="response",outcome="hits"} 1', body
+        )
+        self.assertIn(f"projects_catalog_version {catalog_version()}", body)
+
+
+class ProjectConditionalGetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.projects = build_catalog(5)
+        self.detail = f"/api/projects/{self.projects[0].pk}/"
+
+    def revalidate(self, path, etag):
+        return self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+    def test_matching_etag_is_answered_with_304_in_one_query(self):
+        for path in ["/api/projects/", self.detail]:
+            response = self.client.get(path)
+            self.assertIn("Last-Modified", response.headers)
+            with self.assertNumQueries(1):
+                revalidated = self.revalidate(path, response.headers["ETag"])
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(revalidated.content, b"")
+            self.assertEqual(revalidated.headers["ETag"], response.headers["ETag"])
+
+    def test_if_modified_since_is_answered_with_304(self):
+        response = self.client.get("/api/projects/")
+        revalidated = self.client.get(
+            "/api/projects/", HTTP_IF_MODIFIED_SINCE=response.headers["Last-Modified"]
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_etag_depends_on_query_string(self):
+        plain = self.client.get("/api/projects/").headers["ETag"]
+        filtered = self.client.get("/api/projects/", {"solo": "true"}).headers["ETag"]
+        self.assertNotEqual(plain, filtered)
+
+    @mock.patch.object(
+        ProjectViewSet, "renderer_classes", [JSONRenderer, BrowsableAPIRenderer]
+    )
+    def test_etag_depends_on_renderer(self):
+        for path in ["/api/projects/", self.detail]:
+            json = self.client.get(path)
+            browsable = self.client.get(path, HTTP_ACCEPT="text/html")
+            self.assertNotEqual(json.headers["ETag"], browsable.headers["ETag"])
+            self.assertIn("Accept", json.headers["Vary"])
+            self.assertEqual(
+                self.client.get(
+                    path, HTTP_ACCEPT="text/html", HTTP_IF_NONE_MATCH=json["ETag"]
+                ).status_code,
+                200,
+            )
+
+    def test_changes_invalidate_etag(self):
+        project = self.projects[0]
+        python = Language.objects.get(name="python")
+        both = ["/api/projects/", self.detail]
+        changes = [
+            (lambda: Project.objects.get(pk=project.pk).save(), both),
+            (lambda: project.languages.add(python), both),
+            (lambda: python.save(), both),
+            (lambda: python.project_set.remove(project), both),
+            (lambda: self.projects[-1].delete(), ["/api/projects/"]),
+        ]
+        for change, paths in changes:
+            etags = {path: self.client.get(path).headers["ETag"] for path in paths}
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            for path, etag in etags.items():
+                self.assertEqual(self.revalidate(path, etag).status_code, 200)
+
+    def test_missing_project_has_no_validators(self):
+        response = self.client.get("/api/projects/0/")
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response.headers)
+
+
+class ProjectStatusFilterTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.projects = build_catalog(4)
+        self.user = get_user_model().objects.create_user("user7", user_42_id=7)
+        finished, started = self.projects[:2]
+        UserProjectStatus.objects.create(
+            user=self.user,
+            project_id=finished.project_id,
+            status=UserProjectStatus.FINISHED,
+        )
+        UserProjectStatus.objects.create(
+            user=self.user,
+            project_id=started.project_id,
+            status=UserProjectStatus.IN_PROGRESS,
+        )
+        self.client.force_login(self.user)
+
+    def ids(self, status):
+        response = self.client.get("/api/projects/", {"status": status})
+        self.assertEqual(response.status_code, 200)
+        return sorted(project["id"] for project in response.json())
+
+    def test_filters_on_the_users_progress(self):
+        pks = [project.pk for project in self.projects]
+        self.assertEqual(self.ids("finished"), pks[:1])
+        self.assertEqual(self.ids("in_progress"), pks[1:2])
+        self.assertEqual(self.ids("available"), sorted(pks[2:]))
+
+    def test_filter_joins_in_the_list_query(self):
+        self.client.get("/api/projects/", {"status": "finished"})
+        # The user (sessions are cached), the list and its two relations.
+        with self.assertNumQueries(4):
+            self.client.get("/api/projects/", {"status": "finished"})
+
+    def test_responses_are_private_to_the_user(self):
+        response = self.client.get("/api/projects/", {"status": "finished"})
+        self.assertNotIn("ETag", response.headers)
+        self.assertIn("private", response.headers["Cache-Control"])
+
+        other = get_user_model().objects.create_user("user8", user_42_id=8)
+        self.client.force_login(other)
+        self.assertEqual(self.ids("finished"), [])
+
+    def test_requires_login_and_a_known_status(self):
+        response = self.client.get("/api/projects/", {"status": "started"})
+        self.assertEqual(response.status_code, 400)
+        self.client.logout()
+        response = self.client.get("/api/projects/", {"status": "finished"})
+        self.assertIn(response.status_code, (401, 403))
+
+
+class ProjectChangeFeedTests(TransactionTestCase):
+    """Watermarks follow committed transactions, so these tests commit"""
+
+    serialized_rollback = True
+
+    def setUp(self):
+        get_cache().clear()
+        self.projects = build_catalog(5)
+
+    def changes(self, since=None):
+        response = self.client.get(
+            "/api/projects/changes/", {"since": since} if since else {}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_without_watermark_returns_whole_catalog(self):
+        feed = self.changes()
+        self.assertEqual(len(feed["changed"]), 5)
+        self.assertEqual(feed["deleted"], [])
+        self.assertIsNotNone(feed["watermark"])
+
+    def test_returns_only_changes_after_watermark(self):
+        watermark = self.changes()["watermark"]
+        self.assertEqual(self.changes(watermark)["changed"], [])
+
+        updated, deleted = self.projects[1], self.projects[3]
+        deleted_pk = deleted.pk
+        updated.name = "Renamed"
+        updated.save()
+        deleted.delete()
+        with self.assertNumQueries(5):
+            feed = self.changes(watermark)
+        self.assertEqual([p["name"] for p in feed["changed"]], ["Renamed"])
+        self.assertEqual(feed["deleted"], [deleted_pk])
+        self.assertGreater(int(feed["watermark"]), int(watermark))
+
+        feed = self.changes(feed["watermark"])
+        self.assertEqual((feed["changed"], feed["deleted"]), ([], []))
+
+    def test_retagging_is_reported(self):
+        watermark = self.changes()["watermark"]
+        self.projects[0].languages.add(Language.objects.get(name="python"))
+        feed = self.changes(watermark)
+        self.assertEqual([p["id"] for p in feed["changed"]], [self.projects[0].pk])
+
+    def test_writes_committed_after_a_newer_one_are_not_skipped(self):
+        slow, quick = self.projects[:2]
+        watermark = self.changes()["watermark"]
+        written, release = threading.Event(), threading.Event()
+
+        def long_sync():
+            try:
+                with transaction.atomic():
+                    slow.name = "Slow"
+                    slow.save()
+                    written.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=long_sync)
+        thread.start()
+        written.wait(5)
+        # Written later, committed first: its updated_at is the newer one.
+        quick.name = "Quick"
+        quick.save()
+        feed = self.changes(watermark)
+        self.assertEqual([p["name"] for p in feed["changed"]], ["Quick"])
+
+        release.set()
+        thread.join()
+        feed = self.changes(feed["watermark"])
+        self.assertIn("Slow", [p["name"] for p in feed["changed"]])
+
+    def test_invalid_watermark_is_rejected(self):
+        response = self.client.get("/api/projects/changes/", {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+
+class MemoryTokenStore:
+    """Token store shared by the clients of one test, without the database"""
+
+    def __init__(self):
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.tokens.get(key)
+
+    def refresh(self, key, fetch, is_usable):
+        """The stored token if `is_usable` accepts it, else a new one from
+        `fetch`, fetched at most once at a time"""
+        with self.lock:
+            token = self.tokens.get(key)
+            if token is None or not is_usable(token):
+                token = self.tokens[key] = fetch()
+            return token
+
+
+class Fake42API:
+    """Local stand-in for the 42 API.
+
+    The token endpoint always succeeds, issuing `token-1`, `token-2`... valid
+    for `expires_in` seconds; tokens in `revoked` get a 401. Other calls
+    consume `script`, a list of (status, headers, body, delay) tuples, then
+    answer `default`.
+    """
+
+    def __init__(self):
+        self.script = []
+        self.default = (200, {}, [], 0)
+        self.requests = []
+        self.tokens = []
+        self.revoked = set()
+        self.expires_in = 7200
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                with fake.lock:
+                    fake.requests.append(
+                        (url.path, dict(parse_qsl(url.query)), self.client_address)
+                    )
+                    if token in fake.revoked:
+                        return self.reply(401, {}, {"error": "invalid_token"})
+                    reply = fake.script.pop(0) if fake.script else fake.default
+                    status, headers, body, delay = fake.respond(url, reply)
+                time.sleep(delay)
+                self.reply(status, headers, body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with fake.lock:
+                    fake.requests.append((self.path, {}, self.client_address))
+                    fake.tokens.append(f"token-{len(fake.tokens) + 1}")
+                    body = {"access_token": fake.tokens[-1]}
+                    body["expires_in"] = fake.expires_in
+                self.reply(200, {}, body)
+
+            def reply(self, status, headers, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        # Clients that time out close their socket under a sleeping handler.
+        self.server.handle_error = lambda request, address: None
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def respond(self, url, reply):
+        """Hook for fakes that compute replies from the request"""
+        return reply
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self, token_store=None, **kwargs):
+        client = API42Client(
+            base_url=self.url,
+            uid="uid",
+            secret="secret",
+            rate_limiter=RateLimiter(),
+            token_store=token_store or MemoryTokenStore(),
+        )
+        client.delays = []
+        client.sleep = client.delays.append
+        for name, value in kwargs.items():
+            setattr(client, name, value)
+        return client
+
+
+class API42ClientTransportTests(SimpleTestCase):
+    def setUp(self):
+        self.api = Fake42API().__enter__()
+        self.addCleanup(self.api.__exit__)
+
+    def test_requests_share_one_connection(self):
+        client = self.api.client()
+        for page in range(1, 6):
+            client.get("/v2/cursus/21/projects", {"page": page})
+        self.assertEqual(len(self.api.requests), 6)
+        self.assertEqual(len({address for *_, address in self.api.requests}), 1)
+
+    def test_rate_limited_request_waits_for_retry_after(self):
+        self.api.script = [(429, {"Retry-After": "3"}, {}, 0)]
+        self.api.default = (200, {}, [{"id": 1}], 0)
+        client = self.api.client()
+        self.assertEqual(client.get("/v2/cursus/21/projects"), [{"id": 1}])
+        self.assertEqual(client.delays, [3.0])
+
+    def test_server_errors_back_off_with_jitter_then_give_up(self):
+        self.api.script = [(503, {}, {}, 0)] * 4
+        client = self.api.client(max_retries=3, backoff_base=1.0)
+        with self.assertRaises(requests.HTTPError):
+            client.get("/v2/cursus/21/projects")
+        self.assertEqual(len(client.delays), 3)
+        for attempt, delay in enumerate(client.delays):
+            self.assertTrue(0 <= delay <= 2**attempt)
+
+    def test_slow_responses_time_out_and_are_retried(self):
+        self.api.script = [(200, {}, ["late"], 0.5)]
+        self.api.default = (200, {}, ["on time"], 0)
+        client = self.api.client(timeout=(1, 0.1))
+        self.assertEqual(client.get("/v2/cursus/21/projects"), ["on time"])
+        self.assertEqual(len(client.delays), 1)
+
+
+class API42ClientTokenTests(SimpleTestCase):
+    def setUp(self):
+        self.api = Fake42API().__enter__()
+        self.addCleanup(self.api.__exit__)
+        self.store = MemoryTokenStore()
+
+    def test_clients_share_one_token(self):
+        for _ in range(3):
+            self.api.client(self.store).get("/v2/cursus/21/projects")
+        self.assertEqual(self.api.tokens, ["token-1"])
+
+    def test_token_is_refreshed_before_it_expires(self):
+        self.api.expires_in = 200
+        client = self.api.client(self.store, token_refresh_margin=timedelta(0))
+        client.get("/v2/cursus/21/projects")
+        client.get("/v2/cursus/21/projects")
+        self.assertEqual(self.api.tokens, ["token-1"])
+
+        client.token_refresh_margin = timedelta(seconds=300)
+        client.get("/v2/cursus/21/projects")
+        self.assertEqual(self.api.tokens, ["token-1", "token-2"])
+
+    def test_rejected_token_is_replaced_once(self):
+        self.api.default = (200, {}, [{"id": 1}], 0)
+        client = self.api.client(self.store)
+        client.get("/v2/cursus/21/projects")
+        self.api.revoked.add("token-1")
+        self.assertEqual(client.get("/v2/cursus/21/projects"), [{"id": 1}])
+        self.assertEqual(self.store.get(client.token_key)[0], "token-2")
+
+        self.api.revoked.add("token-2")
+        self.api.revoked.add("token-3")
+        with self.assertRaises(requests.HTTPError) as raised:
+            client.get("/v2/cursus/21/projects")
+        self.assertEqual(raised.exception.response.status_code, 401)
+        self.assertEqual(self.api.tokens, ["token-1", "token-2", "token-3"])
+
+
+class SharedTokenTests(TestCase):
+    def test_token_table_is_shared_by_clients(self):
+        with Fake42API() as api:
+            clients = [
+                API42Client(
+                    base_url=api.url,
+                    uid="uid",
+                    secret="secret",
+                    rate_limiter=RateLimiter(),
+                )
+                for _ in range(2)
+            ]
+            for client in clients:
+                client.get("/v2/cursus/21/projects")
+        self.assertEqual(api.tokens, ["token-1"])
+        token = ApiToken.objects.get(key=clients[0].token_key)
+        self.assertEqual(token.access_token, "token-1")
+        self.assertAlmostEqual(
+            token.expires_at,
+            timezone.now() + timedelta(seconds=7200),
+            delta=timedelta(seconds=60),
+        )
+
+    def test_expired_token_is_replaced_in_the_table(self):
+        with Fake42API() as api:
+            client = API42Client(
+                base_url=api.url,
+                uid="uid",
+                secret="secret",
+                rate_limiter=RateLimiter(),
+            )
+            ApiToken.objects.create(
+                key=client.token_key,
+                access_token="stale",
+                expires_at=timezone.now() + timedelta(seconds=10),
+            )
+            client.get("/v2/cursus/21/projects")
+        self.assertEqual(api.tokens, ["token-1"])
+        self.assertEqual(
+            ApiToken.objects.get(key=client.token_key).access_token, "token-1"
+        )
+
+
+class PagedFake42API(Fake42API):
+    """Fake 42 API serving `projects` in pages, each after `latency` seconds.
+
+    `projects` may also map cursus ids to the projects of each cursus.
+    """
+
+    def __init__(self, projects, latency=0, total_header=True):
+        super().__init__()
+        self.projects = projects
+        self.latency = latency
+        self.total_header = total_header
+
+    def respond(self, url, reply):
+        query = dict(parse_qsl(url.query))
+        page, per_page = int(query["page"]), int(query["per_page"])
+        projects = self.projects
+        if isinstance(projects, dict):
+            projects = projects[int(url.path.split("/")[3])]
+        if "range[updated_at]" in query:
+            start, end = query["range[updated_at]"].split(",")
+            projects = [
+                project
+                for project in projects
+                if parse_datetime(start)
+                <= parse_datetime(project["updated_at"])
+                <= parse_datetime(end)
+            ]
+        headers = {"X-Per-Page": str(per_page)}
+        if self.total_header:
+            headers["X-Total"] = str(len(projects))
+        body = projects[(page - 1) * per_page : page * per_page]
+        return 200, headers, body, self.latency
+
+
+class API42ClientPaginationTests(SimpleTestCase):
+    projects = [{"id": index} for index in range(95)]
+
+    def fetch(self, api, **kwargs):
+        with api:
+            pages = list(
+                api.client().iter_pages("/v2/cursus/21/projects", per_page=10, **kwargs)
+            )
+        return [project["id"] for page in pages for project in page]
+
+    def test_concurrent_pages_arrive_in_order(self):
+        api = PagedFake42API(self.projects, latency=0.1)
+        started = time.monotonic()
+        ids = self.fetch(api, concurrency=5)
+        elapsed = time.monotonic() - started
+        self.assertEqual(ids, list(range(95)))
+        # 10 pages one after another would take a second.
+        self.assertLess(elapsed, 0.7)
+
+    def test_without_total_header_pages_until_empty(self):
+        api = PagedFake42API(self.projects, total_header=False)
+        self.assertEqual(self.fetch(api, concurrency=5), list(range(95)))
+        pages = [query["page"] for path, query, _ in api.requests if query]
+        self.assertEqual(pages, [str(page) for page in range(1, 12)])
+
+    def test_stopping_early_does_not_fetch_every_page(self):
+        with PagedFake42API(self.projects * 10, latency=0.01) as api:
+            pages = api.client().iter_pages(
+                "/v2/cursus/21/projects", per_page=10, concurrency=2
+            )
+            next(pages)
+            next(pages)
+            pages.close()
+            fetched = len(api.requests)
+        self.assertLess(fetched, 10)
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_bursts_up_to_capacity_then_spaces_requests(self):
+        now = [0.0]
+        bucket = TokenBucket(2, clock=lambda: now[0])
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0.5])
+        now[0] += 1.5
+        self.assertEqual(bucket.reserve(), 0)
+
+    def test_limiter_waits_for_the_slowest_bucket(self):
+        now = [0.0]
+        limiter = RateLimiter(
+            TokenBucket(2, clock=lambda: now[0]),
+            TokenBucket(3, per=3600, clock=lambda: now[0]),
+            sleep=lambda delay: None,
+        )
+        delays = []
+        for _ in range(4):
+            delays.append(limiter.acquire())
+            now[0] += 1
+        self.assertEqual(delays[:3], [0, 0, 0])
+        self.assertAlmostEqual(delays[3], 1200 - 3)
+
+    def test_threads_share_the_budget(self):
+        limiter = RateLimiter(TokenBucket(50, capacity=1))
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=lambda: [limiter.acquire() for _ in range(5)])
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - started, 24 / 50 - 0.01)
+
+
+def project_row(project_id, name=None, **tags):
+    fields = {
+        "project_id": project_id,
+        "name": name or f"Project {project_id}",
+        "slug": f"project-{project_id}",
+        "description": "",
+        "objectives": [],
+        "solo": False,
+        "prerequisites": [],
+    }
+    return fields, tags
+
+
+class ProjectWriterTests(TestCase):
+    def setUp(self):
+        ensure_tags()
+
+    def specializations(self, project_id):
+        return set(
+            Project.objects.get(project_id=project_id).specializations.values_list(
+                "name", flat=True
+            )
+        )
+
+    def test_counts_created_and_updated_projects(self):
+        writer = ProjectWriter()
+        writer.write([project_row(1), project_row(2), project_row(3)])
+        writer.write([project_row(2, "Renamed"), project_row(3), project_row(4)])
+        self.assertEqual((writer.created, writer.updated, writer.unchanged), (4, 1, 1))
+        self.assertEqual(Project.objects.get(project_id=2).name, "Renamed")
+
+    def test_batches_cost_a_fixed_number_of_queries(self):
+        writer = ProjectWriter()
+        rows = [project_row(i, specializations=["common_core"]) for i in range(100)]
+        with self.assertNumQueries(5):
+            writer.write(rows)
+        rows = [project_row(i, specializations=["security"]) for i in range(300)]
+        with self.assertNumQueries(6):
+            writer.write(rows)
+        self.assertEqual(self.specializations(99), {"security"})
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        writer = ProjectWriter()
+        writer.write(
+            [project_row(i, specializations=["common_core"]) for i in range(3)]
+        )
+        before = dict(Project.objects.values_list("project_id", "updated_at"))
+        with self.assertNumQueries(1):
+            written = writer.write(
+                [project_row(i, specializations=["common_core"]) for i in range(3)]
+            )
+        self.assertEqual(written, [])
+        self.assertEqual(writer.unchanged, 3)
+        self.assertEqual(
+            dict(Project.objects.values_list("project_id", "updated_at")), before
+        )
+
+    def test_tag_changes_are_changes(self):
+        writer = ProjectWriter()
+        writer.write([project_row(1, specializations=["common_core"])])
+        writer.write([project_row(1, specializations=["security"])])
+        self.assertEqual((writer.updated, writer.unchanged), (1, 0))
+        self.assertEqual(self.specializations(1), {"security"})
+
+    def test_tags_are_replaced_only_when_given(self):
+        writer = ProjectWriter()
+        writer.write([project_row(1, specializations=["common_core", "security"])])
+        writer.write([project_row(1, specializations=["security", "unknown"])])
+        self.assertEqual(self.specializations(1), {"security"})
+        writer.write([project_row(1)])
+        self.assertEqual(self.specializations(1), {"security"})
+
+    def test_duplicate_projects_in_a_batch_keep_the_last_row(self):
+        writer = ProjectWriter()
+        writer.write([project_row(1, "First"), project_row(1, "Second")])
+        self.assertEqual(writer.created, 1)
+        self.assertEqual(Project.objects.get(project_id=1).name, "Second")
+
+    def test_written_projects_are_searchable(self):
+        ProjectWriter().write([project_row(1, "Minishell")])
+        response = self.client.get("/api/projects/", {"search": "minishell"})
+        self.assertEqual(len(response.json()), 1)
+
+
+def api_project(project_id, slug, **overrides):
+    """A 42 API project that passes every fetch_projects filter"""
+    return {
+        "id": project_id,
+        "name": slug.title(),
+        "slug": slug,
+        "difficulty": 1000,
+        "parent": None,
+        "updated_at": "2026-01-01T00:00:00.000Z",
+        "campus": [{"id": campus} for campus in range(1, 11)],
+        "attachments": [],
+        "project_sessions": [
+            {
+                "is_subscriptable": True,
+                "description": f"About {slug}",
+                "objectives": ["Unix"],
+                "estimate_time": "70 hours",
+                "solo": True,
+            }
+        ],
+        **overrides,
+    }
+
+
+class FetchProjectsCommandTests(TestCase):
+    def setUp(self):
+        ensure_tags()
+        self.projects = [api_project(1, "libft"), api_project(2, "malloc")]
+        self.projects += [
+            api_project(100 + index, f"module-{index}") for index in range(150)
+        ]
+        # Filtered out: too few campuses and a forbidden keyword.
+        self.projects.append(api_project(3, "beta", campus=[]))
+        self.projects.append(api_project(4, "exam-rank-02"))
+
+    def fetch(self, api, *args):
+        environment = {"API_42_BASE_URL": api.url, "API_42_RATE_PER_SECOND": "100"}
+        out = StringIO()
+        with mock.patch.dict(os.environ, environment), api:
+            call_command("fetch_projects", *args, stdout=out, stderr=out)
+        return out.getvalue()
+
+    def test_sync_upserts_projects_and_tags(self):
+        out = self.fetch(PagedFake42API(self.projects), "--concurrency", "2")
+        self.assertIn("152 created, 0 updated", out)
+        self.assertEqual(Project.objects.count(), 152)
+        libft = Project.objects.get(project_id=1)
+        self.assertEqual(libft.estimate_time, 70)
+        self.assertEqual(
+            list(libft.specializations.values_list("name", flat=True)),
+            ["common_core"],
+        )
+        self.assertFalse(Project.objects.get(project_id=2).specializations.exists())
+
+        self.projects[1]["name"] = "Malloc v2"
+        out = self.fetch(PagedFake42API(self.projects))
+        self.assertIn("0 created, 1 updated, 151 unchanged", out)
+        self.assertEqual(Project.objects.get(project_id=2).name, "Malloc v2")
+
+    def test_limit(self):
+        out = self.fetch(PagedFake42API(self.projects), "--limit", "120")
+        self.assertIn("120 created", out)
+        self.assertEqual(Project.objects.count(), 120)
+
+    def test_failed_run_saves_nothing(self):
+        api = PagedFake42API(self.projects)
+        api.respond = lambda url, reply: (
+            (404, {}, {}, 0)
+            if "page=2" in url.query
+            else PagedFake42API.respond(api, url, reply)
+        )
+        out = self.fetch(api)
+        self.assertIn("Error fetching projects", out)
+        self.assertFalse(Project.objects.exists())
+
+    def test_several_cursus_share_projects(self):
+        shared = self.projects[50:]
+        api = PagedFake42API({21: self.projects[:100], 9: shared})
+        out = self.fetch(api, "--cursus-id", "21", "9", "--concurrency", "2")
+        self.assertIn("152 created, 0 updated, 0 unchanged", out)
+        self.assertEqual(api.tokens, ["token-1"])
+        # One page of cursus 21 and two of cursus 9, each fetched once.
+        pages = [path for path, query, _ in api.requests if query]
+        self.assertEqual(len(pages), 3)
+        cursus = Cursus.objects.get(cursus_id=9)
+        self.assertEqual(cursus.projects.count(), len(shared) - 2)
+        self.assertEqual(
+            set(
+                Project.objects.get(
+                    project_id=self.projects[60]["id"]
+                ).cursus.values_list("cursus_id", flat=True)
+            ),
+            {21, 9},
+        )
+        self.assertEqual(
+            set(SyncState.objects.values_list("cursus_id", flat=True)), {21, 9}
+        )
+
+        # A full sync of cursus 9 alone drops the projects it no longer lists.
+        api = PagedFake42API({9: shared[:50]})
+        out = self.fetch(api, "--cursus-id", "9")
+        self.assertIn("Cursus links: 0 added, 52 removed", out)
+        self.assertEqual(cursus.projects.count(), 50)
+        self.assertEqual(Cursus.objects.get(cursus_id=21).projects.count(), 100)
+
+
+class IncrementalSyncTests(TestCase):
+    def setUp(self):
+        ensure_tags()
+        self.projects = [
+            api_project(
+                index, f"module-{index}", updated_at=f"2026-01-0{index}T12:00:00Z"
+            )
+            for index in range(1, 6)
+        ]
+
+    def fetch(self, *args):
+        api = PagedFake42API(self.projects)
+        out = StringIO()
+        environment = {"API_42_BASE_URL": api.url, "API_42_RATE_PER_SECOND": "100"}
+        with mock.patch.dict(os.environ, environment), api:
+            call_command("fetch_projects", *args, stdout=out, stderr=out)
+        self.requests = [query for _, query, _ in api.requests if query]
+        return out.getvalue()
+
+    def test_first_incremental_run_is_full_and_records_watermark(self):
+        out = self.fetch("--incremental")
+        self.assertIn("5 created", out)
+        self.assertNotIn("range[updated_at]", self.requests[0])
+        state = SyncState.objects.get(cursus_id=21)
+        self.assertEqual(state.watermark, parse_datetime("2026-01-05T12:00:00Z"))
+        self.assertEqual(state.last_full_sync_at, state.last_sync_at)
+
+    def test_incremental_run_fetches_only_changes(self):
+        self.fetch()
+        self.projects[1].update(name="Changed", updated_at="2026-02-01T00:00:00Z")
+        out = self.fetch("--incremental")
+        self.assertTrue(self.requests[0]["range[updated_at]"].startswith("2026-01-05"))
+        # The project at the watermark itself is fetched again.
+        self.assertIn("0 created, 1 updated, 1 unchanged", out)
+        self.assertEqual(Project.objects.get(project_id=2).name, "Changed")
+        state = SyncState.objects.get(cursus_id=21)
+        self.assertEqual(state.watermark, parse_datetime("2026-02-01T00:00:00Z"))
+
+    def test_stale_full_sync_triggers_reconciliation(self):
+        self.fetch()
+        out = self.fetch("--incremental", "--full-every", "0")
+        self.assertNotIn("range[updated_at]", self.requests[0])
+        self.assertIn("0 created, 0 updated, 5 unchanged", out)
+
+    def test_full_ignores_watermark(self):
+        self.fetch()
+        self.fetch("--full")
+        self.assertNotIn("range[updated_at]", self.requests[0])
+
+    def test_limited_run_keeps_watermark(self):
+        self.fetch("--limit", "2")
+        self.assertIsNone(SyncState.objects.get(cursus_id=21).watermark)
+
+
+class ArchiveReplayTests(TestCase):
+    def setUp(self):
+        ensure_tags()
+        self.projects = [api_project(index, f"module-{index}") for index in range(150)]
+        self.projects.append(api_project(1000, "exam-rank-02"))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive = os.path.join(directory.name, "pages.jsonl.gz")
+
+    def fetch(self, *args):
+        api = PagedFake42API(self.projects)
+        out = StringIO()
+        environment = {"API_42_BASE_URL": api.url, "API_42_RATE_PER_SECOND": "100"}
+        with mock.patch.dict(os.environ, environment), api:
+            call_command("fetch_projects", *args, stdout=out, stderr=out)
+        return out.getvalue()
+
+    def test_runs_append_raw_pages(self):
+        self.fetch("--archive", self.archive)
+        self.fetch("--archive", self.archive)
+        with gzip.open(self.archive, "rt") as archive:
+            records = [json.loads(line) for line in archive]
+        self.assertEqual([record["page"] for record in records], [1, 2, 1, 2])
+        self.assertEqual(records[0]["cursus_id"], 21)
+        self.assertEqual(records[1]["projects"], self.projects[100:])
+
+    def test_replay_runs_the_same_pipeline_offline(self):
+        self.fetch("--archive", self.archive)
+        Project.objects.all().delete()
+        synced_at = SyncState.objects.get(cursus_id=21).last_sync_at
+        out = StringIO()
+        with mock.patch(
+            "projects.management.commands.fetch_projects.API42Client"
+        ) as client:
+            call_command(
+                "fetch_projects", "--from-archive", self.archive, stdout=out, stderr=out
+            )
+        client.assert_not_called()
+        self.assertIn("150 created", out.getvalue())
+        self.assertEqual(Project.objects.count(), 150)
+        # A replay is not news from upstream.
+        self.assertEqual(SyncState.objects.get(cursus_id=21).last_sync_at, synced_at)
+
+    def replay(self, *args):
+        call_command(
+            "fetch_projects", "--from-archive", self.archive, *args, stdout=StringIO()
+        )
+
+    def test_replay_keeps_the_newest_run(self):
+        for title in ["First title", "Second title"]:
+            self.projects[0]["name"] = title
+            self.fetch("--archive", self.archive)
+        Project.objects.all().delete()
+        self.replay()
+        self.assertEqual(Project.objects.get(project_id=0).name, "Second title")
+
+    def test_replay_keeps_the_newest_update_across_cursus(self):
+        runs = [
+            ("21", "Second title", "2026-02-01T00:00:00.000Z"),
+            ("9", "First title", "2026-01-01T00:00:00.000Z"),
+        ]
+        for cursus_id, title, updated_at in runs:
+            self.projects[0].update(name=title, updated_at=updated_at)
+            self.fetch("--archive", self.archive, "--cursus-id", cursus_id)
+        Project.objects.all().delete()
+        for order in [["21", "9"], ["9", "21"]]:
+            self.replay("--cursus-id", *order)
+            self.assertEqual(Project.objects.get(project_id=0).name, "Second title")
+
+    def test_replay_only_reads_the_requested_cursus(self):
+        self.fetch("--archive", self.archive)
+        out = StringIO()
+        call_command(
+            "fetch_projects",
+            "--from-archive",
+            self.archive,
+            "--cursus-id",
+            "9",
+            stdout=out,
+        )
+        self.assertNotIn("Processed page", out.getvalue())
+
+
+class PipelineTests(SimpleTestCase):
+    def slow(self, seconds, function=lambda item: item):
+        def stage(item):
+            time.sleep(seconds)
+            return function(item)
+
+        return stage
+
+    def slow_source(self, count, seconds):
+        for index in range(count):
+            time.sleep(seconds)
+            yield [index]
+
+    def test_stages_overlap_and_keep_order(self):
+        pipeline = Pipeline(
+            self.slow_source(10, 0.03),
+            [("double", self.slow(0.03, lambda item: item * 2))],
+        )
+        started = time.monotonic()
+        items = list(pipeline)
+        elapsed = time.monotonic() - started
+        self.assertEqual(items, [[index, index] for index in range(10)])
+        # Run one after the other, the two stages would take 0.6s.
+        self.assertLess(elapsed, 0.5)
+        fetch, double, sink = pipeline.stats
+        self.assertEqual((fetch.items, double.records, sink.items), (10, 20, 10))
+
+    def test_buffers_are_bounded(self):
+        pipeline = Pipeline(([index] for index in range(50)), [], buffer=3)
+        for item in pipeline:
+            time.sleep(0.002)
+        self.assertLessEqual(pipeline.stats[0].depth_max, 3)
+
+    def test_stage_errors_reach_the_consumer(self):
+        def fail(item):
+            raise ValueError("bad page")
+
+        with self.assertRaisesMessage(ValueError, "bad page"):
+            list(Pipeline(([index] for index in range(3)), [("fail", fail)]))
+
+    def test_leaving_early_stops_the_source(self):
+        closed = threading.Event()
+
+        def source():
+            try:
+                for index in range(1000):
+                    yield [index]
+            finally:
+                closed.set()
+
+        pages = iter(Pipeline(source(), [("copy", list)], buffer=2))
+        next(pages)
+        pages.close()
+        self.assertTrue(closed.is_set())
+
+    def test_merge_reads_sources_concurrently(self):
+        sources = [self.slow_source(5, 0.03) for _ in range(3)]
+        started = time.monotonic()
+        items = list(merge(sources))
+        elapsed = time.monotonic() - started
+        self.assertEqual(sorted(items), sorted([[index] for index in range(5)] * 3))
+        # One source after the other would take 0.45s.
+        self.assertLess(elapsed, 0.35)
+
+    def test_merge_reraises_source_errors(self):
+        def broken():
+            yield [0]
+            raise ValueError("bad cursus")
+
+        with self.assertRaisesMessage(ValueError, "bad cursus"):
+            list(merge([broken(), self.slow_source(50, 0.01)]))
+
+
+class WorkerConnectionTests(TestCase):
+    """Threads that query the database close their connection when done"""
+
+    def setUp(self):
+        self.opened = []
+
+    def query(self, item):
+        ApiToken.objects.exists()
+        self.opened.append(connections["default"])
+        return item
+
+    def assertClosed(self):
+        self.assertTrue(self.opened)
+        for connection in self.opened:
+            self.assertIsNone(connection.connection)
+
+    def test_pipeline_and_merge_threads(self):
+        source = (self.query([index]) for index in range(3))
+        pipeline = Pipeline(source, [("query", self.query)])
+        self.assertEqual(list(pipeline), [[0], [1], [2]])
+        self.assertEqual(len({id(connection) for connection in self.opened}), 2)
+        self.assertClosed()
+
+        self.opened.clear()
+        sources = [(self.query(item) for item in "ab"), (self.query(c) for c in "c")]
+        self.assertEqual(sorted(merge(sources)), ["a", "b", "c"])
+        self.assertClosed()
+
+    def test_background_tasks(self):
+        run_in_background(self.query, None).result(5)
+        self.assertClosed()
+
+
+class FetchProjectsReportTests(TestCase):
+    def setUp(self):
+        ensure_tags()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def test_debug_reports_and_stage_stats(self):
+        projects = [
+            api_project(1, "libft"),
+            api_project(2, "beta", campus=[]),
+            api_project(3, "exam-rank-02"),
+        ]
+        api = PagedFake42API(projects)
+        out = StringIO()
+        environment = {"API_42_BASE_URL": api.url, "API_42_RATE_PER_SECOND": "100"}
+        with mock.patch.dict(os.environ, environment), api:
+            call_command("fetch_projects", "--debug", stdout=out, stderr=out)
+        with open("maybe_beta.txt") as report:
+            self.assertEqual(report.read(), "beta\n")
+        with open("forbidden_keyword.txt") as report:
+            self.assertEqual(report.read(), "exam-rank-02, forbidden keyword 'exam'\n")
+        with open("tagged.txt") as report:
+            self.assertEqual(
+                report.read(), "libft, specialization 'libft' -> common_core\n"
+            )
+        for stage in ["fetch", "classify", "transform", "write"]:
+            self.assertRegex(out.getvalue(), rf"  {stage} +1 items")
+
+
+class RuleSetTests(TestCase):
+    """The seeded rules reproduce the filters fetch_projects used to
+    hard-code"""
+
+    def setUp(self):
+        self.rules = RuleSet.load()
+
+    def test_skip_keywords_ignore_case_and_report_the_rule(self):
+        self.assertEqual(self.rules.skip_rule("Exam Rank 02", "").pattern, "exam")
+        self.assertEqual(self.rules.skip_rule("", "42-folder").pattern, "old")
+        self.assertIsNone(self.rules.skip_rule("Malloc", "malloc"))
+
+    def test_common_core_slugs(self):
+        for slug in ["libft", "cpp-module-04", "ft_transcendence", "42cursus-FdF"]:
+            self.assertEqual(
+                self.rules.tags(slug), {"specializations": ["common_core"]}
+            )
+        self.assertEqual(self.rules.tags("fdf"), {})
+        self.assertEqual(self.rules.tags("malloc"), {})
+
+    def test_campus_rules(self):
+        self.assertEqual(self.rules.min_campuses, 9)
+        self.assertTrue(self.rules.has_excluded_campus([1, 38]))
+        self.assertFalse(self.rules.has_excluded_campus([1, 2]))
+
+    def test_overlapping_fragments_all_fire(self):
+        rules = RuleSet(
+            [
+                ClassificationRule(kind="language", pattern="cpp", target="cpp"),
+                ClassificationRule(kind="language", pattern="module", target="c"),
+            ]
+        )
+        self.assertEqual(rules.tags("cpp-module-00"), {"languages": ["cpp", "c"]})
+
+    def test_fragments_starting_at_the_same_position_all_fire(self):
+        rules = RuleSet(
+            [
+                ClassificationRule(kind="language", pattern="c", target="c"),
+                ClassificationRule(kind="language", pattern="cpp", target="cpp"),
+                ClassificationRule(kind="language", pattern="cpp-mod", target="na"),
+            ]
+        )
+        self.assertEqual(rules.tags("cpp-module-00"), {"languages": ["na", "cpp", "c"]})
+
+    def test_rules_that_would_break_the_sync_are_invalid(self):
+        ensure_tags()
+        invalid = [
+            ("min_campuses", "nine", "", "pattern"),
+            ("excluded_campus", "-38", "", "pattern"),
+            ("specialization", "libft", "", "target"),
+            ("language", "cpp-module", "c++", "target"),
+        ]
+        for kind, pattern, target, field in invalid:
+            rule = ClassificationRule(kind=kind, pattern=pattern, target=target)
+            with self.subTest(kind=kind, pattern=pattern):
+                with self.assertRaises(ValidationError) as raised:
+                    rule.full_clean()
+                self.assertEqual(list(raised.exception.message_dict), [field])
+        ClassificationRule(kind="min_campuses", pattern="12").full_clean()
+        ClassificationRule(
+            kind="language", pattern="cpp-module", target="cpp"
+        ).full_clean()
+
+    def test_rules_are_read_from_the_database(self):
+        ClassificationRule.objects.filter(pattern="exam").update(enabled=False)
+        ClassificationRule.objects.create(kind="skip_keyword", pattern="malloc")
+        rules = RuleSet.load()
+        self.assertIsNone(rules.skip_rule("Exam Rank 02", ""))
+        self.assertEqual(rules.skip_rule("Malloc", "").pattern, "malloc")
+
+    def test_sync_applies_language_rules_and_reports_fired_rules(self):
+        ensure_tags()
+        ClassificationRule.objects.create(
+            kind="language", pattern="cpp-module", target="cpp"
+        )
+        api = PagedFake42API(
+            [api_project(1, "cpp-module-00"), api_project(2, "exam-rank-02")]
+        )
+        out = StringIO()
+        environment = {"API_42_BASE_URL": api.url, "API_42_RATE_PER_SECOND": "100"}
+        with mock.patch.dict(os.environ, environment), api:
+            call_command("fetch_projects", stdout=out, stderr=out)
+        project = Project.objects.get(project_id=1)
+        self.assertEqual(
+            list(project.languages.values_list("name", flat=True)), ["cpp"]
+        )
+        self.assertEqual(
+            list(project.specializations.values_list("name", flat=True)),
+            ["common_core"],
+        )
+        self.assertIn("1  skip_keyword 'exam'", out.getvalue())
+        self.assertIn("1  language 'cpp-module' -> cpp", out.getvalue())
+
+
+def projects_user(project_id, status="finished", **overrides):
+    """A 42 API `projects_users` entry"""
+    return {
+        "id": 1000 + project_id,
+        "final_mark": 100 if status == "finished" else None,
+        "status": status,
+        "validated?": True if status == "finished" else None,
+        "marked_at": "2026-02-01T10:00:00.000Z" if status == "finished" else None,
+        "project": {"id": project_id, "slug": f"project-{project_id}"},
+        **overrides,
+    }
+
+
+class ProgressImportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("user7", user_42_id=7)
+
+    def statuses(self):
+        return dict(
+            UserProjectStatus.objects.filter(user=self.user).values_list(
+                "project_id", "status"
+            )
+        )
+
+    def test_imports_every_page_then_replaces_stale_rows(self):
+        entries = [projects_user(index) for index in range(150)]
+        entries.append(projects_user(500, "waiting_for_correction"))
+        with PagedFake42API(entries) as api:
+            self.assertEqual(import_progress(self.user, api.client()), 151)
+        paths = {path for path, query, _ in api.requests if query}
+        self.assertEqual(paths, {"/v2/users/7/projects_users"})
+        statuses = self.statuses()
+        self.assertEqual(len(statuses), 151)
+        self.assertEqual(statuses[500], UserProjectStatus.IN_PROGRESS)
+        progress = UserProjectStatus.objects.get(user=self.user, project_id=500)
+        self.assertEqual(progress.status_42, "waiting_for_correction")
+
+        with PagedFake42API([projects_user(500), projects_user(1)]) as api:
+            import_progress(self.user, api.client())
+        self.assertEqual(
+            self.statuses(),
+            {500: UserProjectStatus.FINISHED, 1: UserProjectStatus.FINISHED},
+        )
+
+    def test_imports_share_the_process_client(self):
+        shared_client.cache_clear()
+        self.addCleanup(shared_client.cache_clear)
+        api = PagedFake42API([projects_user(1)])
+        environment = {"API_42_BASE_URL": api.url, "API_42_RATE_PER_SECOND": "100"}
+        with mock.patch.dict(os.environ, environment), api, mock.patch(
+            "projects.services.api_client.API42Client", wraps=API42Client
+        ) as constructor:
+            import_progress(self.user)
+            import_progress(self.user)
+            shared_client().close()
+        constructor.assert_called_once()
+        self.assertEqual(self.statuses(), {1: UserProjectStatus.FINISHED})
+
+
+class ToggleTagTests(TestCase):
+    def setUp(self):
+        build_catalog(20)
+        self.python = Language.objects.get(name="python")
+
+    def python_projects(self):
+        return set(
+            Project.objects.filter(languages=self.python).values_list("pk", flat=True)
+        )
+
+    def test_toggles_each_selected_project(self):
+        selection = Project.objects.order_by("pk")[:10]
+        selected = set(selection.values_list("pk", flat=True))
+        before = self.python_projects()
+        added, removed = toggle_tag(
+            Project.objects.filter(pk__in=selected), "languages", self.python
+        )
+        self.assertEqual(self.python_projects(), before ^ selected)
+        self.assertEqual(
+            (added, removed), (10 - len(before & selected), len(before & selected))
+        )
+
+    def test_selections_cost_a_fixed_number_of_queries(self):
+        # Selections mixing tagged and untagged projects.
+        toggle_tag(Project.objects.order_by("pk")[:2], "languages", self.python)
+        with self.assertNumQueries(6):
+            toggle_tag(Project.objects.order_by("pk")[:5], "languages", self.python)
+        build_catalog(300, start=20)
+        with self.assertNumQueries(6):
+            toggle_tag(Project.objects.all(), "languages", self.python)
+
+    def test_touches_selected_projects_and_notifies_once(self):
+        before = dict(Project.objects.values_list("pk", "updated_at"))
+        selected = sorted(before)[:3]
+        with mock.patch("projects.signals.bump_catalog_version_on_commit") as bump:
+            toggle_tag(
+                Project.objects.filter(pk__in=selected), "languages", self.python
+            )
+        bump.assert_called_once_with()
+        after = dict(Project.objects.values_list("pk", "updated_at"))
+        self.assertEqual(
+            {pk for pk in before if after[pk] != before[pk]}, set(selected)
+        )
+
+    def test_admin_has_a_toggle_action_per_tag(self):
+        actions = {action.__name__: action for action in ProjectAdmin.actions}
+        self.assertEqual(
+            len(actions),
+            len(Language.LANGUAGE_CHOICES) + len(Specialization.SPECIALIZATION_CHOICES),
+        )
+        modeladmin = mock.Mock()
+        project = Project.objects.exclude(languages__name="java").first()
+        actions["toggle_java"](modeladmin, None, Project.objects.filter(pk=project.pk))
+        self.assertTrue(project.languages.filter(name="java").exists())
+        modeladmin.message_user.assert_called_once_with(
+            None, "Java: added to 1 projects, removed from 0"
+        )
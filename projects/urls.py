@@ -6,5 +6,6 @@ router = DefaultRouter()
 router.register(r"projects", views.ProjectViewSet)
 
 urlpatterns = [
+    path("api/metrics/cache/", views.cache_metrics, name="cache_metrics"),
     path("api/", include(router.urls)),
 ]
@@ -1,20 +1,360 @@
+import hashlib
+from functools import cached_property
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Count, Prefetch, Q, Subquery
+from django.http import Http404, HttpResponse
+from django.db.models.functions import Greatest
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Project
-from .serializers import ProjectSerializer
+from .cache import (
+    cache_stats,
+    cached_response,
+    catalog_version,
+    conditional_response,
+    get_cache,
+    query_cache_key,
+    record,
+)
+from .filters import ProjectSearchFilter, UserStatusFilter
+from .models import Language, Project, ProjectTombstone, Specialization
+from .pagination import KeysetPagination
+from .serializers import (
+    FastProjectSerializer,
+    ProjectSerializer,
+    ProjectSuggestionSerializer,
+)
 
 
 class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
+    # Search runs last so its relevance order survives the default ordering.
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        UserStatusFilter,
         filters.OrderingFilter,
+        ProjectSearchFilter,
     ]
     filterset_fields = ["solo", "difficulty", "languages", "specializations"]
-    search_fields = ["name", "description"]
     ordering_fields = ["name", "xp_points", "estimate_time"]
     ordering = ["name"]
+    # Serialize list/detail from values() rows instead of model instances.
+    fast_serialization = True
+
+    def get_queryset(self):
+        """Load only the columns and relations the response needs.
+
+        Nested languages/specializations are loaded with one query each, so
+        a list costs the same number of queries whatever the catalog size.
+        Ordering fields are always loaded because pagination cursors use them.
+        """
+        columns = {"id", *self.ordering_fields}
+        relations = []
+        for name in self.requested_fields:
+            field = Project._meta.get_field(name)
+            if field.many_to_many:
+                related = field.related_model.objects.order_by("name")
+                relations.append(Prefetch(name, queryset=related))
+            else:
+                columns.add(name)
+        return Project.objects.only(*columns).prefetch_related(*relations)
+
+    @conditional_response
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        if not self.fast_serialization:
+            return super().list(request, *args, **kwargs)
+        serializer = FastProjectSerializer(self.requested_fields)
+        rows = serializer.values(
+            self.filter_queryset(self.get_queryset()), extra=self.ordering_fields
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
+
+    @conditional_response
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        if not self.fast_serialization:
+            return super().retrieve(request, *args, **kwargs)
+        serializer = FastProjectSerializer(self.requested_fields)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            rows = serializer.values(
+                queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            )
+            data = serializer.serialize(rows)
+        except (TypeError, ValueError):
+            data = None
+        if not data:
+            raise Http404
+        return Response(data[0])
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.requested_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    @cached_property
+    def requested_fields(self):
+        """Compact representation for lists and full one for detail, narrowed
+        by `?fields=a,b` and `?omit=a,b`"""
+        available = ProjectSerializer.Meta.fields
+        params = self.request.query_params
+        if params.get("fields"):
+            wanted = params["fields"].split(",")
+            fields = [name for name in available if name in wanted]
+        elif self.action == "retrieve":
+            fields = available
+        else:
+            fields = ProjectSerializer.LIST_FIELDS
+        omitted = params.get("omit", "").split(",")
+        return [name for name in fields if name not in omitted]
+
+    def is_personalized(self, request):
+        """Whether the response depends on the user, which rules out shared
+        caching and catalog-wide validators"""
+        return bool(request.query_params.get(UserStatusFilter.param))
+
+    def get_validators(self, request, **kwargs):
+        """(strong ETag, Last-Modified) from a single indexed query.
+
+        Relation and tag edits touch `Project.updated_at` (see signals), and
+        the newest tombstone catches deletions, which leave max(updated_at)
+        as it was. Both are read from the top of their `updated_at` and
+        `deleted_at` indexes. The URL with its normalized query string and
+        the negotiated media type are part of the ETag, as every query and
+        renderer is a different representation.
+        """
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                last_modified = (
+                    Project.objects.filter(
+                        **{self.lookup_field: kwargs[lookup_url_kwarg]}
+                    )
+                    .values_list("updated_at", flat=True)
+                    .first()
+                )
+            except (TypeError, ValueError):
+                last_modified = None
+            if last_modified is None:
+                return None, None
+            state = last_modified.isoformat()
+        else:
+            newest_tombstone = ProjectTombstone.objects.order_by("-deleted_at").values(
+                "deleted_at"
+            )[:1]
+            last_updated, last_deleted = (
+                Project.objects.annotate(last_deleted=Subquery(newest_tombstone))
+                .order_by("-updated_at")
+                .values_list("updated_at", "last_deleted")
+                .first()
+            ) or (None, None)
+            last_modified = max(
+                filter(None, [last_updated, last_deleted]), default=None
+            )
+            state = "|".join(
+                stamp.isoformat() if stamp else ""
+                for stamp in [last_updated, last_deleted]
+            )
+
+        url = query_cache_key(
+            "projects:etag",
+            request.query_params,
+            scope=request.build_absolute_uri(request.path),
+        )
+        representation = f"{url}|{request.accepted_media_type}|{state}"
+        etag = '"%s"' % hashlib.sha1(representation.encode()).hexdigest()
+        return etag, last_modified
+
+    # (label, lower bound, upper bound) on Project.difficulty
+    difficulty_buckets = [
+        ("0-999", 0, 1_000),
+        ("1000-4999", 1_000, 5_000),
+        ("5000-9999", 5_000, 10_000),
+        ("10000-24999", 10_000, 25_000),
+        ("25000+", 25_000, None),
+    ]
+    # Query parameters that do not change which projects match.
+    facets_ignored_params = ["ordering", "page_size", "cursor", "fields", "omit"]
+
+    @action(detail=False)
+    def facets(self, request):
+        """Per-language, per-specialization, solo and difficulty counts for
+        the projects matching the current filters and search"""
+        if self.is_personalized(request):
+            return Response(
+                self.compute_facets(self.filter_queryset(self.get_queryset()))
+            )
+        cache = get_cache()
+        key = query_cache_key(
+            f"projects:facets:{catalog_version()}",
+            request.query_params,
+            self.facets_ignored_params,
+        )
+        data = cache.get(key)
+        if data is None:
+            record("facets", "misses")
+            data = self.compute_facets(self.filter_queryset(self.get_queryset()))
+            cache.set(key, data)
+        else:
+            record("facets", "hits")
+        return Response(data)
+
+    def compute_facets(self, queryset):
+        """Three aggregate queries, whatever the number of matching projects"""
+        matching = queryset.order_by().values("pk")
+        tags = {}
+        for name, model in [
+            ("languages", Language),
+            ("specializations", Specialization),
+        ]:
+            tags[name] = dict(
+                model.objects.annotate(
+                    count=Count("project", filter=Q(project__in=matching))
+                )
+                .order_by("name")
+                .values_list("name", "count")
+            )
+
+        aggregates = {
+            "total": Count("pk"),
+            "solo_true": Count("pk", filter=Q(solo=True)),
+            "solo_false": Count("pk", filter=Q(solo=False)),
+            "difficulty_unknown": Count("pk", filter=Q(difficulty__isnull=True)),
+        }
+        for index, (_, low, high) in enumerate(self.difficulty_buckets):
+            bucket = Q(difficulty__gte=low)
+            if high is not None:
+                bucket &= Q(difficulty__lt=high)
+            aggregates[f"difficulty_{index}"] = Count("pk", filter=bucket)
+        counts = Project.objects.filter(pk__in=matching).aggregate(**aggregates)
+
+        difficulty = {
+            label: counts[f"difficulty_{index}"]
+            for index, (label, _, _) in enumerate(self.difficulty_buckets)
+        }
+        difficulty["unknown"] = counts["difficulty_unknown"]
+        return {
+            "count": counts["total"],
+            **tags,
+            "solo": {"true": counts["solo_true"], "false": counts["solo_false"]},
+            "difficulty": difficulty,
+        }
+
+    suggest_limit = 8
+    suggest_max_limit = 20
+
+    @action(detail=False, url_path="suggest")
+    def suggest(self, request):
+        """Typo-tolerant autocomplete on name and slug, served from the
+        pg_trgm GIN indexes in a single query"""
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response([])
+        try:
+            limit = int(request.query_params.get("limit", self.suggest_limit))
+        except ValueError:
+            limit = self.suggest_limit
+        limit = max(1, min(limit, self.suggest_max_limit))
+
+        matches = (
+            Project.objects.filter(
+                Q(name__trigram_word_similar=query)
+                | Q(slug__trigram_word_similar=query)
+            )
+            .annotate(
+                similarity=Greatest(
+                    TrigramWordSimilarity(query, "name"),
+                    TrigramWordSimilarity(query, "slug"),
+                )
+            )
+            .order_by("-similarity", "name")
+            .values("id", "name", "slug")[:limit]
+        )
+        return Response(ProjectSuggestionSerializer(matches, many=True).data)
+
+    @action(detail=False)
+    def changes(self, request):
+        """Projects created or updated after `?since=`, ids of projects
+        deleted after it, and the watermark to send as `since` next time.
+
+        Rows are ordered by the transaction that wrote them (`change_txid`,
+        set by a trigger), not by timestamp: `updated_at` is stamped at write
+        time, so a long sync could commit rows older than a watermark already
+        handed out. The watermark is the oldest transaction still running
+        when the feed is read; everything written by older ones is in this
+        response or an earlier one. Rows of transactions from the watermark
+        on may be sent again, so clients apply the feed as upserts on `id`.
+
+        Without `since` the whole catalog is returned. The feed ignores
+        filters and search: a project leaving a filtered view would otherwise
+        never be reported.
+        """
+        since = request.query_params.get("since")
+        changed = self.get_queryset()
+        deleted = ProjectTombstone.objects.all()
+        if since:
+            try:
+                since = int(since)
+            except ValueError:
+                raise ValidationError(
+                    {"since": "Expected a watermark returned by this endpoint."}
+                )
+            changed = changed.filter(change_txid__gte=since)
+            deleted = deleted.filter(change_txid__gte=since)
+        else:
+            deleted = deleted.none()
+
+        # Read before the rows, so every transaction older than it has
+        # finished by the time they are.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+            (watermark,) = cursor.fetchone()
+
+        serializer = FastProjectSerializer(self.requested_fields)
+        rows = serializer.values(changed.order_by("change_txid", "id"))
+        tombstones = deleted.order_by("change_txid").values_list(
+            "project_pk", flat=True
+        )
+        return Response(
+            {
+                "watermark": str(watermark),
+                "changed": serializer.serialize(rows),
+                "deleted": list(tombstones),
+            }
+        )
+
+
+@staff_member_required
+def cache_metrics(request):
+    """Response cache counters in the Prometheus text format, for staff"""
+    lines = [
+        "# HELP projects_cache_requests_total Project API cache lookups.",
+        "# TYPE projects_cache_requests_total counter",
+    ]
+    for name, outcomes in cache_stats().items():
+        for outcome, value in outcomes.items():
+            lines.append(
+                f'projects_cache_requests_total{{cache="{name}",outcome="{outcome}"}} '
+                f"{value}"
+            )
+    lines += [
+        "# HELP projects_catalog_version Current catalog cache version.",
+        "# TYPE projects_catalog_version gauge",
+        f"projects_catalog_version {catalog_version()}",
+    ]
+    return HttpResponse(
+        "\n".join(lines) + "\n", content_type="text/plain; version=0.0.4"
+    )
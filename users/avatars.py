@@ -0,0 +1,92 @@
+import hashlib
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from projects.services.background import run_in_background
+
+# Pillow format name -> file extension of the stored original
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+
+class AvatarError(Exception):
+    pass
+
+
+def download(url):
+    """Body of `url`, refusing anything larger than AVATAR_MAX_BYTES"""
+    with requests.get(
+        url,
+        stream=True,
+        timeout=(settings.AVATAR_CONNECT_TIMEOUT, settings.AVATAR_READ_TIMEOUT),
+    ) as response:
+        response.raise_for_status()
+        content = b""
+        for chunk in response.iter_content(64 * 1024):
+            content += chunk
+            if len(content) > settings.AVATAR_MAX_BYTES:
+                raise AvatarError(f"{url} is larger than {settings.AVATAR_MAX_BYTES}")
+    return content
+
+
+def store(name, content):
+    """Save `content` as `name` unless it is already there. Names are
+    derived from the content, so an existing file is the same file."""
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, ContentFile(content))
+        if saved != name:
+            raise AvatarError(f"{name} was stored as {saved}")
+    return name
+
+
+def thumbnail(image, size):
+    """Square JPEG of `size` pixels cropped from the middle of `image`"""
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    output = BytesIO()
+    image.save(output, "JPEG", quality=85, optimize=True)
+    return output.getvalue()
+
+
+def refresh_avatar(user):
+    """Copy the image at `user.image_url` and a thumbnail of it to the media
+    storage, under names derived from the image content.
+
+    Skipped when the URL is the one already copied, so a login only costs a
+    download when the avatar changed upstream. Returns whether it downloaded.
+    """
+    url = user.image_url
+    if not url or (url == user.avatar_source_url and user.avatar_thumbnail):
+        return False
+
+    content = download(url)
+    try:
+        image = Image.open(BytesIO(content))
+        image.load()
+    except (OSError, Image.DecompressionBombError) as error:
+        raise AvatarError(f"{url} is not an image: {error}") from error
+    extension = EXTENSIONS.get(image.format)
+    if extension is None:
+        raise AvatarError(f"{url} is a {image.format} image")
+
+    digest = hashlib.sha256(content).hexdigest()
+    size = settings.AVATAR_THUMBNAIL_SIZE
+    user.avatar = store(f"avatars/{digest}.{extension}", content)
+    user.avatar_thumbnail = store(
+        f"avatars/{digest}-{size}.jpg", thumbnail(image, size)
+    )
+    user.avatar_source_url = url
+    user.save(update_fields=["avatar", "avatar_thumbnail", "avatar_source_url"])
+    return True
+
+
+def schedule_avatar_refresh(user):
+    """Refresh the avatar of `user` in the background, if its URL changed.
+    Returns the future, or None when there is nothing to do."""
+    if not user.image_url or user.image_url == user.avatar_source_url:
+        return None
+    return run_in_background(refresh_avatar, user)
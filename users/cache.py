@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+
+from .models import User
+
+PROFILE_KEY = "users:profile:{pk}"
+# Fields returned by /api/auth/user/
+PUBLIC_FIELDS = ["id", "username", "login_42", "email", "image_url", "campus"]
+
+
+def get_cache():
+    """Cache holding sessions and user profiles. Configured by the `users`
+    alias in CACHES."""
+    return caches["users"]
+
+
+def build_profile(user):
+    """Compact cached form of `user`: its public fields plus what the
+    session check needs"""
+    profile = {name: getattr(user, name) for name in PUBLIC_FIELDS}
+    if user.avatar_thumbnail:
+        # The local copy, served by nginx from /media/
+        profile["image_url"] = user.avatar_thumbnail.url
+    profile["is_active"] = user.is_active
+    profile["session_hash"] = user.get_session_auth_hash()
+    return profile
+
+
+def get_profile(pk):
+    """Profile of user `pk`, from the cache or else the database"""
+    cache = get_cache()
+    key = PROFILE_KEY.format(pk=pk)
+    profile = cache.get(key)
+    if profile is None:
+        user = User.objects.filter(pk=pk).first()
+        if user is None:
+            return None
+        profile = build_profile(user)
+        cache.set(key, profile)
+    return profile
+
+
+def invalidate_profile(pk):
+    get_cache().delete(PROFILE_KEY.format(pk=pk))
+
+
+def invalidate_profile_on_commit(pk):
+    # Dropping it before the write is visible would let a concurrent request
+    # cache the old row again.
+    transaction.on_commit(lambda: invalidate_profile(pk))
+
+
+def request_profile(request):
+    """Profile of the user logged in on `request`, None when anonymous.
+
+    With a cached session and profile, this runs no query. It checks what
+    `request.user` would (backend, active flag, session hash). When the
+    hash does not match, `request.user` decides instead, which also flushes
+    sessions invalidated by a password change.
+    """
+    session = request.session
+    try:
+        pk = User._meta.pk.to_python(session[SESSION_KEY])
+        backend = session[BACKEND_SESSION_KEY]
+    except (KeyError, ValidationError):
+        return None
+    if backend not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    profile = get_profile(pk)
+    if profile is None or not profile["is_active"]:
+        return None
+    if constant_time_compare(
+        session.get(HASH_SESSION_KEY, ""), profile["session_hash"]
+    ):
+        return profile
+    if request.user.is_authenticated:
+        return build_profile(request.user)
+    return None
@@ -0,0 +1,22 @@
+import requests
+from django.core.management.base import BaseCommand
+
+from users.avatars import AvatarError, refresh_avatar
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Copy the 42 avatars that changed upstream into MEDIA_ROOT"
+
+    def handle(self, *args, **options):
+        refreshed = failed = 0
+        users = User.objects.exclude(image_url__isnull=True).exclude(image_url="")
+        for user in users.iterator():
+            try:
+                refreshed += refresh_avatar(user)
+            except (AvatarError, requests.RequestException) as e:
+                failed += 1
+                self.stderr.write(f"{user}: {e}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed {refreshed} avatars, {failed} failed")
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar",
+            field=models.ImageField(blank=True, upload_to="avatars/"),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="avatar_source_url",
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="avatar_thumbnail",
+            field=models.ImageField(blank=True, upload_to="avatars/"),
+        ),
+    ]
@@ -8,6 +8,10 @@ class User(AbstractUser):
     email_42 = models.EmailField(null=True, blank=True)
     image_url = models.URLField(null=True, blank=True)
     campus = models.CharField(max_length=100, null=True, blank=True)
+    # Local copies of `image_url`, kept by users.avatars
+    avatar = models.ImageField(upload_to="avatars/", blank=True)
+    avatar_thumbnail = models.ImageField(upload_to="avatars/", blank=True)
+    avatar_source_url = models.URLField(null=True, blank=True)
 
     def __str__(self):
         return self.username
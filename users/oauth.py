@@ -0,0 +1,55 @@
+import ssl
+from functools import cache
+
+import certifi
+import httpx
+from django.conf import settings
+
+
+@cache
+def get_ssl_context():
+    # Loading the CA bundle takes tens of milliseconds, which would block
+    # the event loop on every login.
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def get_client():
+    """HTTP client for one login, with the OAuth timeouts. Use it with
+    `async with`, so its connection is closed when the login is done."""
+    return httpx.AsyncClient(
+        verify=get_ssl_context(),
+        timeout=httpx.Timeout(
+            settings.OAUTH_42_READ_TIMEOUT,
+            connect=settings.OAUTH_42_CONNECT_TIMEOUT,
+            pool=settings.OAUTH_42_CONNECT_TIMEOUT,
+        ),
+    )
+
+
+def json_object(response):
+    """The JSON object in `response`, None for any other body"""
+    data = response.json()
+    return data if isinstance(data, dict) else None
+
+
+async def exchange_code(client, code):
+    """Access token for an authorization `code`, None if 42 refused it"""
+    token_data = {
+        "grant_type": "authorization_code",
+        "client_id": settings.OAUTH_42_CLIENT_ID,
+        "client_secret": settings.OAUTH_42_CLIENT_SECRET,
+        "code": code,
+        "redirect_uri": settings.OAUTH_42_REDIRECT_URI,
+    }
+    response = await client.post(settings.OAUTH_42_TOKEN_URL, data=token_data)
+    data = json_object(response)
+    return data.get("access_token") if data else None
+
+
+async def fetch_user(client, access_token):
+    """42 profile of the owner of `access_token`, None if unavailable"""
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = await client.get(settings.OAUTH_42_USER_URL, headers=headers)
+    if response.status_code != 200:
+        return None
+    return json_object(response)
@@ -1,3 +1,320 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from projects.services.progress import schedule_progress_import
+
+from .avatars import refresh_avatar
+from .cache import get_cache
+from .models import User
+
+
+class Fake42OAuth:
+    """Local stand-in for the 42 OAuth endpoints and CDN, answering after
+    `delay` seconds. The code `n` is exchanged for the token of user `n`;
+    `files` maps CDN paths to their content and `bodies` overrides the JSON
+    answered on an API path."""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.files = {}
+        self.bodies = {}
+        self.downloads = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                form = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                code = dict(parse_qsl(form.decode()))["code"]
+                time.sleep(fake.delay)
+                self.reply(200, {"access_token": f"token-{code}"})
+
+            def do_GET(self):
+                if self.path in fake.files:
+                    fake.downloads.append(self.path)
+                    payload = fake.files[self.path]
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    return self.wfile.write(payload)
+                token = self.headers["Authorization"].removeprefix("Bearer token-")
+                time.sleep(fake.delay)
+                if not token.isdigit():
+                    return self.reply(401, {"error": "invalid_token"})
+                login = f"user{token}"
+                self.reply(
+                    200,
+                    {
+                        "id": int(token),
+                        "login": login,
+                        "email": f"{login}@student.42.fr",
+                        "image": {"versions": {"medium": ""}},
+                        "campus": [{"name": "Lisboa"}],
+                    },
+                )
+
+            def reply(self, status, body):
+                body = fake.bodies.get(self.path, body)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # Room for every login of the load test to connect at once
+            request_queue_size = 64
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.handle_error = lambda request, address: None
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def settings(self, **overrides):
+        return override_settings(
+            OAUTH_42_TOKEN_URL=f"{self.url}/oauth/token",
+            OAUTH_42_USER_URL=f"{self.url}/v2/me",
+            **overrides,
+        )
+
+
+class OAuthCallbackTests(TestCase):
+    def setUp(self):
+        self.api = Fake42OAuth().__enter__()
+        self.addCleanup(self.api.__exit__)
+        patcher = mock.patch("users.views.schedule_progress_import")
+        self.schedule = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def login(self, code):
+        return await self.async_client.get("/api/auth/callback/", {"code": code})
+
+    async def test_callback_creates_and_logs_in_the_user(self):
+        with self.api.settings():
+            response = await self.login("7")
+        self.assertRedirects(
+            response, "https://42projects.cc/dashboard", fetch_redirect_response=False
+        )
+        user = await User.objects.aget(user_42_id=7)
+        self.assertEqual((user.login_42, user.campus), ("user7", "Lisboa"))
+        session = await self.async_client.asession()
+        self.assertEqual(await session.aget("_auth_user_id"), str(user.pk))
+        self.schedule.assert_called_once_with(user)
+
+    async def test_login_does_not_wait_for_the_progress_import(self):
+        imported = threading.Event()
+
+        def slow_import(user):
+            time.sleep(1)
+            imported.set()
+
+        with mock.patch("projects.services.progress.import_progress", slow_import):
+            self.schedule.side_effect = schedule_progress_import
+            with self.api.settings():
+                started = time.monotonic()
+                await self.login("7")
+            self.assertLess(time.monotonic() - started, 0.5)
+            self.assertFalse(imported.is_set())
+            await asyncio.to_thread(imported.wait, 5)
+        self.assertTrue(imported.is_set())
+
+    async def test_rejected_token_reports_user_info_failure(self):
+        with self.api.settings():
+            response = await self.login("bad")
+        self.assertEqual(
+            response.url, "https://42projects.cc/auth/callback?error=user_info_failed"
+        )
+
+    async def test_json_other_than_an_object_is_a_failure(self):
+        self.api.bodies["/oauth/token"] = ["token-7"]
+        with self.api.settings():
+            response = await self.login("7")
+        self.assertTrue(response.url.endswith("?error=token_failed"))
+
+        self.api.bodies = {"/v2/me": []}
+        with self.api.settings():
+            response = await self.login("7")
+        self.assertTrue(response.url.endswith("?error=user_info_failed"))
+
+    async def test_slow_42_api_times_out(self):
+        self.api.delay = 1
+        with self.api.settings(OAUTH_42_READ_TIMEOUT=0.1):
+            started = time.monotonic()
+            response = await self.login("7")
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(
+            response.url, "https://42projects.cc/auth/callback?error=token_failed"
+        )
+
+    async def test_project_latency_stays_flat_during_slow_logins(self):
+        async def project_latencies(count):
+            latencies = []
+            for _ in range(count):
+                started = time.monotonic()
+                response = await self.async_client.get("/api/projects/")
+                latencies.append(time.monotonic() - started)
+                self.assertEqual(response.status_code, 200)
+                await asyncio.sleep(0.05)
+            return latencies
+
+        # Each login waits twice on the 42 API: 20 of them one after the
+        # other would take 20 seconds.
+        self.api.delay = 0.5
+        with self.api.settings():
+            baseline = await project_latencies(5)
+            started = time.monotonic()
+            logins = [asyncio.create_task(self.login(str(n))) for n in range(20)]
+            loaded = await project_latencies(10)
+            responses = await asyncio.gather(*logins)
+            elapsed = time.monotonic() - started
+
+        self.assertTrue(
+            all(response.url.endswith("/dashboard") for response in responses)
+        )
+        self.assertEqual(await User.objects.acount(), 20)
+        self.assertLess(elapsed, 3)
+        self.assertLess(max(loaded), max(0.25, 5 * max(baseline)))
+
+
+class UserInfoTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(
+            "user7", password="secret", user_42_id=7, login_42="user7"
+        )
+        self.client.force_login(self.user)
+
+    def test_cached_session_and_profile_cost_no_query(self):
+        self.client.get("/api/auth/user/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/auth/user/")
+        self.assertEqual(response.json()["login_42"], "user7")
+
+    def test_profile_changes_are_served(self):
+        self.client.get("/api/auth/user/")
+        self.user.campus = "Porto"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get("/api/auth/user/").json()["campus"], "Porto")
+
+    def test_logout_ends_the_session(self):
+        self.client.get("/api/auth/user/")
+        session_key = self.client.session.session_key
+        self.client.post("/api/auth/logout/")
+        self.assertEqual(self.client.get("/api/auth/user/").status_code, 401)
+        # Replaying the old session cookie does not bring the user back.
+        self.client.cookies["sessionid"] = session_key
+        self.assertEqual(self.client.get("/api/auth/user/").status_code, 401)
+
+    def test_password_change_and_deactivation_end_sessions(self):
+        self.client.get("/api/auth/user/")
+        self.user.set_password("changed")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get("/api/auth/user/").status_code, 401)
+
+        self.client.force_login(self.user)
+        self.client.get("/api/auth/user/")
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get("/api/auth/user/").status_code, 401)
+
+
+def image(color, size=(300, 200), format="PNG"):
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, format)
+    return output.getvalue()
+
+
+class AvatarTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.api = Fake42OAuth().__enter__()
+        self.addCleanup(self.api.__exit__)
+        self.api.files["/red.png"] = image("red")
+        self.api.files["/blue.jpg"] = image("blue", format="JPEG")
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings = override_settings(MEDIA_ROOT=media.name, AVATAR_THUMBNAIL_SIZE=64)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(
+            "user7", user_42_id=7, image_url=f"{self.api.url}/red.png"
+        )
+
+    def stored(self):
+        return sorted(os.listdir(os.path.join(self.media_root, "avatars")))
+
+    def test_copies_avatar_and_thumbnail_under_content_names(self):
+        self.assertTrue(refresh_avatar(self.user))
+        self.assertRegex(self.user.avatar.name, r"^avatars/[0-9a-f]{64}\.png$")
+        self.assertEqual(
+            self.user.avatar_thumbnail.name, self.user.avatar.name[:-4] + "-64.jpg"
+        )
+        with Image.open(self.user.avatar_thumbnail.path) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ("JPEG", (64, 64)))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_source_url, f"{self.api.url}/red.png")
+
+    def test_downloads_again_only_when_the_url_changes(self):
+        refresh_avatar(self.user)
+        self.assertFalse(refresh_avatar(self.user))
+        self.assertEqual(self.api.downloads, ["/red.png"])
+
+        self.user.image_url = f"{self.api.url}/blue.jpg"
+        self.assertTrue(refresh_avatar(self.user))
+        self.assertEqual(len(self.stored()), 4)
+
+        # Same picture under a new URL: downloaded, but stored once.
+        self.api.files["/red-again.png"] = self.api.files["/red.png"]
+        self.user.image_url = f"{self.api.url}/red-again.png"
+        refresh_avatar(self.user)
+        self.assertEqual(len(self.stored()), 4)
+
+    def test_user_info_points_at_the_local_copy(self):
+        refresh_avatar(self.user)
+        self.client.force_login(self.user)
+        image_url = self.client.get("/api/auth/user/").json()["image_url"]
+        self.assertEqual(
+            image_url, f"http://testserver/media/{self.user.avatar_thumbnail.name}"
+        )
+
+    def test_rejects_what_is_not_an_image(self):
+        out, err = StringIO(), StringIO()
+        self.api.files["/page.html"] = b"<html></html>"
+        User.objects.filter(pk=self.user.pk).update(
+            image_url=f"{self.api.url}/page.html"
+        )
+        call_command("refresh_avatars", stdout=out, stderr=err)
+        self.assertIn("0 avatars, 1 failed", out.getvalue())
+        self.assertIn("is not an image", err.getvalue())
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
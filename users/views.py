@@ -1,11 +1,15 @@
 from django.http import JsonResponse
 from django.shortcuts import redirect
-from django.contrib.auth import login, logout
+from django.contrib.auth import alogin, logout
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-import requests
+import httpx
 import urllib.parse
+from projects.services.progress import schedule_progress_import
+from .avatars import schedule_avatar_refresh
+from .cache import PUBLIC_FIELDS, request_profile
 from .models import User
+from .oauth import exchange_code, fetch_user, get_client
 
 
 def oauth_login(request):
@@ -28,60 +32,67 @@ def logout_user(request):
 
 
 @csrf_exempt
-def oauth_callback(request):
-    """Handle 42 OAuth callback"""
+async def oauth_callback(request):
+    """Handle 42 OAuth callback.
+
+    Async, so logins waiting on the 42 API do not hold a worker.
+    """
     if request.method == "GET":
         # Handle direct OAuth callback from 42
         code = request.GET.get("code")
         if not code:
             return redirect("https://42projects.cc/auth/callback?error=no_code")
 
-        # Process the OAuth code
-        token_data = {
-            "grant_type": "authorization_code",
-            "client_id": settings.OAUTH_42_CLIENT_ID,
-            "client_secret": settings.OAUTH_42_CLIENT_SECRET,
-            "code": code,
-            "redirect_uri": settings.OAUTH_42_REDIRECT_URI,
-        }
-
-        token_response = requests.post(settings.OAUTH_42_TOKEN_URL, data=token_data)
-        token_json = token_response.json()
-
-        if "access_token" not in token_json:
-            return redirect("https://42projects.cc/auth/callback?error=token_failed")
-
-        # Get user info from 42
-        headers = {"Authorization": f"Bearer {token_json['access_token']}"}
-        user_response = requests.get(settings.OAUTH_42_USER_URL, headers=headers)
-
-        if user_response.status_code != 200:
+        async with get_client() as client:
+            # Process the OAuth code
+            try:
+                access_token = await exchange_code(client, code)
+            except (httpx.HTTPError, ValueError):
+                access_token = None
+            if not access_token:
+                return redirect(
+                    "https://42projects.cc/auth/callback?error=token_failed"
+                )
+
+            # Get user info from 42
+            try:
+                user_data = await fetch_user(client, access_token)
+            except (httpx.HTTPError, ValueError):
+                user_data = None
+        if user_data is None:
             return redirect(
                 "https://42projects.cc/auth/callback?error=user_info_failed"
             )
 
-        user_data = user_response.json()
-
         try:
+            image_url = (
+                user_data.get("image", {}).get("versions", {}).get("medium", "")
+            )
             # Create or get user
-            user, created = User.objects.get_or_create(
+            user, created = await User.objects.aget_or_create(
                 user_42_id=user_data["id"],
                 defaults={
                     "username": user_data["login"],
                     "login_42": user_data["login"],
                     "email": user_data["email"],
                     "email_42": user_data["email"],
-                    "image_url": user_data.get("image", {})
-                    .get("versions", {})
-                    .get("medium", ""),
+                    "image_url": image_url,
                     "campus": user_data.get("campus", [{}])[0].get("name", "")
                     if user_data.get("campus")
                     else "",
                 },
             )
 
+            if not created and image_url and image_url != user.image_url:
+                user.image_url = image_url
+                await user.asave(update_fields=["image_url"])
+
             # Log in the user
-            login(request, user)
+            await alogin(request, user)
+
+            # Import their 42 progress and copy their avatar in the background
+            schedule_progress_import(user)
+            schedule_avatar_refresh(user)
 
             # Redirect to dashboard after successful login
             return redirect("https://42projects.cc/dashboard")
@@ -101,15 +112,10 @@ def oauth_callback(request):
 
 def user_info(request):
     """Get current user info"""
-    if request.user.is_authenticated:
-        return JsonResponse(
-            {
-                "id": request.user.id,
-                "username": request.user.username,
-                "login_42": request.user.login_42,
-                "email": request.user.email,
-                "image_url": request.user.image_url,
-                "campus": request.user.campus,
-            }
-        )
+    profile = request_profile(request)
+    if profile is not None:
+        data = {name: profile[name] for name in PUBLIC_FIELDS}
+        if data["image_url"] and data["image_url"].startswith("/"):
+            data["image_url"] = request.build_absolute_uri(data["image_url"])
+        return JsonResponse(data)
     return JsonResponse({"error": "Not authenticated"}, status=401)